@@ -11,7 +11,8 @@ else:
 from cantera import *
 import numpy as np
 
-from .SpeciesInfo import SpeciesInfo
+from .SpeciesGrid import SpeciesGrid
+from .scheduler import COMPOSITION, Debouncer
 #from KineticsFrame import KineticsFrame
 
 _CUTOFF = 1.e-15
@@ -77,8 +78,8 @@ class CompFrame(Frame):
 
         elif c == 2:
             pass
+        self.top.update(COMPOSITION)
         self.top.thermo.setState()
-        self.top.kinetics.show()
 
     def show(self):
         mf = self.master
@@ -101,17 +102,7 @@ class CompFrame(Frame):
             mf.comp = g.concentrations
             #mf.data = spdict(mix,mix,mf.comp)
 
-        for s in mf.variable.keys():
-            try:
-                k = g.species_index(s)
-                if mf.comp[k] > _CUTOFF:
-                    mf.variable[s].set(mf.comp[k])
-                else:
-                    mf.variable[s].set(0.0)
-            except:
-                pass
-
-
+        mf.table.setValues(mf.comp)
 
     def zero(self):
         mf = self.master
@@ -127,10 +118,6 @@ class MixtureFrame(Frame):
         self.top = top
         self.top.mixframe = self
         self.g = self.top.mix.g
-        #self.scroll = Scrollbar(self)
-        self.entries=Frame(self)
-        #self.scroll.config(command=self.entries.xview)
-        #self.scroll.grid(column=0,row=1)
         self.var = StringVar()
         self.var.set("Moles")
         self.comp = np.array(self.top.mix.moles())
@@ -139,9 +126,12 @@ class MixtureFrame(Frame):
         #self.data = self.top.mix.moleDict()
         self.makeControls()
         self.makeEntries()
-        self.entries.bind('<Double-l>',self.minimize)
+        self.table.bind('<Double-l>',self.minimize)
         self.ctype = 0
         self.newcomp = 0
+        # pointer motion across the grid fires <Any-Leave> on every entry;
+        # edits are committed once the pointer has been quiet for a while
+        self.debounce = Debouncer(self, self.commit)
 
     def makeControls(self):
         self.c = CompFrame(self)
@@ -151,15 +141,11 @@ class MixtureFrame(Frame):
         #self.k.grid(column=2,row=0,sticky=E+W+N+S)
 
     def update(self):
-        self.newcomp = 0
-        for s in self.variable.keys():
-            k = self.g.species_index(s)
-            current = self.comp[k]
-            val = self.variable[s].get()
-            dv = abs(val - current)
-            if dv > _RTOL*abs(current) + _ATOL:
-                self.comp[k] = val
-                self.newcomp = 1
+        vals = self.table.get()
+        changed = abs(vals - self.comp) > _RTOL*abs(self.comp) + _ATOL
+        self.newcomp = int(changed.any())
+        if self.newcomp:
+            self.comp[changed] = vals[changed]
 
     def show(self):
         self.active.show()
@@ -171,84 +157,45 @@ class MixtureFrame(Frame):
 ##                              self.variable[sp].set(0.0)
 
     def redo(self):
+        # the grid is reconfigured in place; no widgets are rebuilt
+        self.debounce.flush()
         self.update()
-        self.entries.destroy()
-        self.entries=Frame(self)
-        self.makeEntries()
+        self.table.setHide(self.c.hide.get())
+        equil = 0
+        if self.top.thermo:
+            equil = self.top.thermo.equil.get()
+        self.table.setEditable(not equil)
 
     def minimize(self,Event=None):
         self.c.hide.set(1)
         self.redo()
         self.c.grid_forget()
-        self.entries.bind("<Double-1>",self.maximize)
+        self.table.bind("<Double-1>",self.maximize)
 
     def maximize(self,Event=None):
         self.c.hide.set(0)
         self.redo()
         self.c.grid(column=1,row=0,sticky=E+W+N+S)
-        self.entries.bind("<Double-1>",self.minimize)
+        self.table.bind("<Double-1>",self.minimize)
+
+    def up(self, x=None):
+        self.debounce.trigger()
 
-    def up(self, x):
+    def commit(self, x=None):
+        self.debounce.cancel()
         self.update()
         if self.newcomp:
+            # the display is refreshed by the update scheduler
             self.c.set()
-            self.c.show()
-            self.top.update()
             #thermo.showState()
             #self.top.kinetics.show()
 
     def makeEntries(self):
-        self.entries.grid(row=0,column=0,sticky=W+N+S+E)
-        self.entries.config(relief=FLAT,bd=4)
-        DATAKEYS = self.top.species
-        self.variable = {}
-
-        n=0
-        ncol = 3
-        col = 0
-        row = 60
-
         equil = 0
         if self.top.thermo:
             equil = self.top.thermo.equil.get()
-
-        for sp in DATAKEYS:
-            s = sp # self.top.species[sp]
-            k = s.index
-            if row > 25:
-                row = 0
-                col += 2
-                l = Label(self.entries,text='Species')
-                l.grid(column=col,row=row,sticky=E+W)
-                e1 = Entry(self.entries)
-                e1.grid(column=col+1,row=row,sticky=E+W)
-                e1['textvariable'] = self.var
-                e1.config(state=DISABLED)
-                e1.config(bg='lightyellow',relief=RIDGE)
-                row += 1
-
-            spname = s.name
-            val = self.comp[k]
-            if not self.c.hide.get() or val: showit = 1
-            else:  showit = 0
-
-            l=SpeciesInfo(self.entries,species=s,
-                          text=spname,relief=FLAT,justify=RIGHT,
-                          fg='darkblue')
-            entry1 = Entry(self.entries)
-            self.variable[spname] = DoubleVar()
-            self.variable[spname].set(self.comp[k])
-            entry1['textvariable']=self.variable[spname]
-            entry1.bind('<Any-Leave>',self.up)
-            if showit:
-                l.grid(column= col ,row=row,sticky=E)
-                entry1.grid(column=col+1,row=row)
-                n += 1
-                row += 1
-            if equil == 1:
-                entry1.config(state=DISABLED,bg='lightgray')
-##                 if self.c.hide.get():
-##                  b=Button(self.entries,height=1,command=self.maximize)
-##              else:
-##                  b=Button(self.entries,command=self.minimize)
-##                 b.grid(column=col,columnspan=2, row=row+1)
+        self.table = SpeciesGrid(self, self.top.species, self.var,
+                                 nrows=25, editable=not equil,
+                                 onleave=self.up, onreturn=self.commit)
+        self.table.grid(row=0,column=0,sticky=W+N+S+E)
+        self.table.setValues(self.comp)
@@ -5,23 +5,32 @@ import os, math, string, sys
 
 if sys.version_info[0] == 3:
     from tkinter import *
-    from tkinter.filedialog import askopenfilename
+    from tkinter.filedialog import askopenfilename, asksaveasfilename
+    import queue
 else:
     from Tkinter import *
-    from tkFileDialog import askopenfilename
+    from tkFileDialog import askopenfilename, asksaveasfilename
+    import Queue as queue
 
 from cantera import *
 import numpy as np
 from .GraphFrame import Graph
 from .DataGraph import DataGraph, plotLimits
 from .ControlPanel import make_menu
+from .utilities import handleError
+from .lru import LRUCache
+from . import dataset
+from .dataset import T_LOC, P_LOC, Y_LOC
+import threading
 
+# interval in ms at which the progress of a file being read is checked
+_POLL = 100
 
-U_LOC = 1
-V_LOC = 2
-T_LOC = 3
-P_LOC = 4
-Y_LOC = 5
+# memory budget for datasets kept after another one is shown
+_CACHEBYTES = 256*1024*1024
+
+# loaded datasets, by mechanism, file, time modified and simulation id
+_datasets = LRUCache(maxbytes=_CACHEBYTES)
 
 def testit(e = None):
     pass
@@ -42,6 +51,7 @@ class DataFrame(Frame):
         self.mix = self.top.mix
         self.g = self.top.mix.g
         self.data = None
+        self.key = None
         self.zdata = None
         self.ydata = None
         self.plt = None
@@ -64,9 +74,18 @@ class DataFrame(Frame):
         self.sc.config(cnf={'from':0,'to':1})
         Label(self.scframe,text='Grid Point').grid(column=0,row=0)
         self.sc.grid(row=0,column=1)
-        self.sc.bind('<ButtonRelease-1>',self.updateState)
         self.gr.grid(row=4,column=0,columnspan=10)
 
+        # progress of files read in the background
+        self.status = StringVar()
+        self.loadframe = Frame(self)
+        Label(self.loadframe,textvariable=self.status).grid(column=0,row=0)
+        Button(self.loadframe,text='Cancel',
+               command=self.cancelLoad).grid(column=1,row=0)
+        self.cancel = None
+        self.loaded = queue.Queue()
+        self.polling = None
+
         self.grid(column=0,row=10)
         self.makeMenu()
         self.hide()
@@ -75,7 +94,8 @@ class DataFrame(Frame):
     def makeMenu(self):
         self.menubar = Frame(self, relief=GROOVE,bd=2)
         self.menubar.grid(row=0,column=0,sticky=N+W+E,columnspan=10)
-        f = [('Open...',self.browseForDatafile)]
+        f = [('Open...',self.browseForDatafile),
+             ('Save as Binary...',self.saveBinary)]
         #make_menu('File',self.menubar,items)
         make_menu('File',self.menubar,f)
         make_menu('Dataset',self.menubar,self.datasets)
@@ -84,7 +104,8 @@ class DataFrame(Frame):
 
     def browseForDatafile(self, e=None):
         pathname = askopenfilename(
-                filetypes=[("Data Files", ("*.xml","*.csv","*.dat")),
+                filetypes=[("Data Files", ("*.xml","*.csv","*.dat",
+                                           "*"+dataset.BINARY)),
                            ("All Files", "*.*")])
         if pathname:
             self.datafile.set(pathname)
@@ -97,29 +118,42 @@ class DataFrame(Frame):
         self.datasets = []
         if len(ff) == 2 and (ff[1] == '.xml' or ff[1] == '.ctml'):
 
-            x = XML.XML_Node('root',src=self.datafile.get())
-            c = x.child('ctml')
-            self.solns = c.children('simulation')
-            if len(self.solns) > 1:
-                i = 0
-                for soln in self.solns:
-                    self.datasets.append((soln['id'],self.pickSoln,
+            try:
+                self.index = dataset.xmlIndex(self.datafile.get())
+            except Exception as e:
+                handleError('could not read '+self.datafile.get()+
+                            ':\n'+str(e))
+                return
+            ids = self.index.ids
+            if not ids:
+                handleError(self.datafile.get()+' contains no simulations')
+                return
+            if len(ids) > 1:
+                for i, sid in enumerate(ids):
+                    self.datasets.append((sid,self.pickSoln,
                                           'check',self.whichsoln,i))
-                    i += 1
-            self.solnid.set(self.solns[-1]['id'])
-            self.soln = self.solns[-1]
+            self.whichsoln.set(len(ids) - 1)
+            self.solnid.set(ids[-1])
 
             self.importData()
 
         elif len(ff) == 2 and (ff[1] == '.csv' or ff[1] == '.CSV'):
             self.importCSV()
 
+        elif len(ff) == 2 and ff[1] == dataset.BINARY:
+            self.importBinary()
+
         self.makeMenu()
         if self.loc.get() <= 0:
             self.loc.set(self.lastloc)
 
 
     def importCSV(self):
+        """Start reading a CSV file on a worker thread.
+
+        The column mapping is read from the header here; the worker only
+        parses numbers, and the data is installed by poll() when done.
+        """
         self.lastloc = self.loc.get()
         if self.lastloc <= 0: self.lastloc = T_LOC
         self.vars = []
@@ -127,78 +161,175 @@ class DataFrame(Frame):
         self.ydata = None
         if self.plt:
             self.plt.destroy()
+            self.plt = None
 
-        with open(self.datafile.get(),'r') as f:
-            vars = f.readline().split(',')
-        nv = len(vars)
-        vv = []
-        for n in range(nv):
-            nm = vars[n].split()
-            if n < nv - 1 or (len(nm) > 0 and nm[0].isalnum()):
-                vv.append(nm[0])
-            else:
+        fname = self.datafile.get()
+        self.nsp = self.g.n_species
+        self.cancelLoad()
+        self.loadkey = self.datasetKey()
+        if self.cachedData(self.loadkey):
+            return
+        cols = dataset.csvColumns(fname, self.g)
+        self.csvcols = cols
+        self.cancel = threading.Event()
+        t = threading.Thread(target=self._readCSV,
+                             args=(fname, cols, self.cancel))
+        t.daemon = True
+        t.start()
+        self.status.set('Reading '+os.path.basename(fname)+'...')
+        self.loadframe.grid(row=6,column=0,columnspan=10)
+        if self.polling is None:
+            self.polling = self.after(_POLL, self.poll)
+
+    def _readCSV(self, fname, cols, cancel):
+        def progress(f):
+            self.loaded.put((cancel, 'progress', f))
+        try:
+            result = dataset.readCSV(fname, cols, self.nsp, progress,
+                                     cancel.is_set)
+            self.loaded.put((cancel, 'done', result))
+        except dataset.Cancelled:
+            pass
+        except Exception as e:
+            self.loaded.put((cancel, 'error', e))
+
+    def cancelLoad(self):
+        if self.cancel:
+            self.cancel.set()
+            self.cancel = None
+        self.status.set('')
+        self.loadframe.grid_forget()
+
+    def poll(self):
+        self.polling = None
+        while True:
+            try:
+                cancel, what, value = self.loaded.get_nowait()
+            except queue.Empty:
                 break
-        nv = len(vv)
-        vars = vv
-        fdata = np.genfromtxt(self.datafile.get(), dtype=float, delimiter=',',
-                              skip_header=1).transpose()
+            if cancel is not self.cancel:
+                # from a load that has been cancelled or replaced
+                continue
+            if what == 'progress':
+                self.status.set('Reading %s... %d%%' % (
+                    os.path.basename(self.datafile.get()), 100*value))
+                continue
+            self.cancel = None
+            self.status.set('')
+            self.loadframe.grid_forget()
+            if what == 'error':
+                handleError('could not read '+self.datafile.get()+
+                            ':\n'+str(value))
+            else:
+                data, label = value
+                self.setData(data, label,
+                             [(nm, loc) for c, loc, nm in self.csvcols[1:]],
+                             self.loadkey)
+        if self.cancel:
+            self.polling = self.after(_POLL, self.poll)
+
+    def importBinary(self):
+        """Open a binary dataset; its columns are memory-mapped."""
+        self.lastloc = self.loc.get()
+        if self.lastloc <= 0: self.lastloc = T_LOC
+        self.vars = []
+        self.zdata = None
+        self.ydata = None
+        if self.plt:
+            self.plt.destroy()
+            self.plt = None
+        self.cancelLoad()
         self.nsp = self.g.n_species
+        key = self.datasetKey()
+        if self.cachedData(key):
+            return
+        try:
+            data, label, cols = dataset.openBinary(self.datafile.get(),
+                                                   self.g)
+        except Exception as e:
+            handleError('could not read '+self.datafile.get()+':\n'+str(e))
+            return
+        self.setData(data, label, cols, key)
+
+    def saveBinary(self):
+        if self.data is None:
+            return
+        pathname = asksaveasfilename(
+                filetypes=[("Binary Datasets", "*"+dataset.BINARY)],
+                defaultextension=dataset.BINARY)
+        if pathname:
+            try:
+                dataset.writeBinary(pathname, self.data, self.label,
+                                    self.g.species_names)
+            except Exception as e:
+                handleError('could not write '+pathname+':\n'+str(e))
+
+    def datasetKey(self, simulation=None):
+        """The key of the current file (and simulation) in the cache."""
+        fname = self.datafile.get()
+        try:
+            mtime = os.path.getmtime(fname)
+        except OSError:
+            return None
+        return (self.top.mechkey, os.path.abspath(fname), mtime, simulation)
+
+    def cachedData(self, key):
+        """Install the dataset cached under key, if there is one."""
+        value = _datasets.get(key) if key is not None else None
+        if value is None:
+            return False
+        self.setData(*value, key=key)
+        return True
+
+    def setData(self, data, label, cols, key=None):
+        """Install a dataset; cols lists the (label, row) to plot.
+
+        The dataset is cached under key, if given, so that it can be shown
+        again without reading the file.
+        """
+        if self.key is not None and self.data is not None:
+            # store the old dataset again, since its size grows as its
+            # arrays are decoded
+            _datasets.put(self.key, (self.data, self.label, self.cols))
+        self.data = data
+        self.label = label
+        self.cols = cols
+        self.key = key
+        if key is not None:
+            _datasets.put(key, (data, label, cols))
         self.y = np.zeros(self.nsp,'d')
-        self.data = np.zeros((self.nsp+6,fdata.shape[1]),'d')
-        self.data[0,:] = fdata[0,:]
-        self.label = ['-']*(self.nsp+6)
-        self.label[0] = vars[0]
+        npts = data.shape[1]
         w = []
-        for n in range(1,nv-1):
-            try:
-                k = self.g.species_index(vars[n])
-            except:
-                k = -1
-            v2 = vars[n]
-            if v2 == 'T':
-                self.data[T_LOC,:] = fdata[n,:]
-                self.label[T_LOC] = vars[n]
-                w.append(('T', self.newplot, 'check', self.loc, T_LOC))
-            elif v2 == 'P':
-                self.data[P_LOC,:] = fdata[n,:]
-                self.label[P_LOC] = vars[n]
-                w.append((vars[n], self.newplot, 'check', self.loc, P_LOC))
-            elif v2 == 'u':
-                self.data[U_LOC,:] = fdata[n,:]
-                self.label[U_LOC] = vars[n]
-                w.append((vars[n], self.newplot, 'check', self.loc, U_LOC))
-            elif v2 == 'V':
-                self.data[V_LOC,:] = fdata[n,:]
-                self.label[V_LOC] = vars[n]
-                w.append((vars[n], self.newplot, 'check', self.loc, V_LOC))
-            elif k >= 0:
-                self.data[k+Y_LOC,:] = fdata[n,:]
-                self.label[k+Y_LOC] = vars[n]
-                w.append((vars[n], self.newplot, 'check', self.loc, k + Y_LOC))
-
-        if self.data[P_LOC,0] == 0.0:
-            self.data[P_LOC,:] = np.ones(fdata.shape[1],'d')*one_atm
+        for nm, loc in cols:
+            if loc > 0:
+                w.append((nm, self.newplot, 'check', self.loc, loc))
+
+        if npts and self.data[P_LOC,0] == 0.0:
+            self.data[P_LOC,:] = np.ones(npts,'d')*one_atm
             print('Warning: no pressure data. P set to 1 atm.')
 
-        self.sc.config(cnf={'from':0,'to':fdata.shape[1]-1})
+        self.sc.config(cnf={'from':0,'to':npts-1})
         if self.loc.get() <= 0:
             self.loc.set(self.lastloc)
         self.updateplot()
 
         self.vars = w
-        #self.makeMenu()
+        self.makeMenu()
         self.scframe.grid(row=5,column=0,columnspan=10)
 
 
     def pickSoln(self):
-        self.solnid.set(self.solns[self.whichsoln.get()]['id'])
-        self.soln = self.solns[self.whichsoln.get()]
+        self.solnid.set(self.index.ids[self.whichsoln.get()])
 #        self.t.destroy()
         self.importData()
 
 
     def importData(self):
+        """Show the selected simulation of an XML file.
 
+        Only the index of the simulation is read here; each array is
+        decoded from the file when it is first plotted.
+        """
         self.lastloc = self.loc.get()
         if self.lastloc <= 0: self.lastloc = T_LOC
         self.vars = []
@@ -206,58 +337,19 @@ class DataFrame(Frame):
         self.ydata = None
         if self.plt:
             self.plt.destroy()
-
+            self.plt = None
+        self.cancelLoad()
         self.nsp = self.g.n_species
-        self.label = ['-']*(self.nsp + 6)
-
-        self.y = np.zeros(self.nsp,'d')
-        gdata = self.soln.child('flowfield/grid_data')
-        xp = self.soln.child('flowfield').children('float')
-        p = 0.0
-        for x in xp:
-            if x['title'] == 'pressure':
-                p = float(x.value())
-        fa = gdata.children('floatArray')
-        data_size = int(fa[0]['size'])
-
-        self.data = np.zeros((self.nsp+6,data_size),'d')
-        w = []
-        for f in fa:
-            t = f['title']
-            try:
-                k = self.g.species_index(t)
-            except:
-                k = -1
-            v = XML.getFloatArray(f)
-            if t == 'z' or t == 't':
-                self.data[0,:] = v
-                self.label[0] = t
-            elif k >= 0:
-                self.data[k + Y_LOC] = v
-                self.label[k + Y_LOC] = t
-                w.append((t, self.newplot, 'check', self.loc, k + Y_LOC))
-            elif t == 'T':
-                self.data[T_LOC,:] = v
-                self.label[T_LOC] = t
-                w.append((t, self.newplot, 'check', self.loc, T_LOC))
-            elif t == 'u':
-                self.data[U_LOC,:] = v
-                self.label[U_LOC] = t
-                w.append((t, self.newplot, 'check', self.loc, U_LOC))
-            elif t == 'V':
-                self.data[V_LOC,:] = v
-                self.label[V_LOC] = t
-                w.append((t, self.newplot, 'check', self.loc, V_LOC))
-
-        self.data[P_LOC,:] = np.ones(data_size,'d')*p
-        self.label[P_LOC] = 'P (Pa)'
-        self.sc.config(cnf={'from':0,'to':data_size-1})
-        if self.loc.get() <= 0:
-            self.loc.set(self.lastloc)
-        self.updateplot()
-
-        self.vars = w
-        self.scframe.grid(row=5,column=0,columnspan=10)
+        key = self.datasetKey(self.solnid.get())
+        if self.cachedData(key):
+            return
+        try:
+            data, label, cols = self.index.read(self.solnid.get(), self.g)
+        except Exception as e:
+            handleError('could not read '+self.solnid.get()+' from '+
+                        self.datafile.get()+':\n'+str(e))
+            return
+        self.setData(data, label, cols, key)
 
 
     def hide(self):
@@ -270,10 +362,7 @@ class DataFrame(Frame):
 
     def updateState(self, e=None):
         n = self.n.get()
-        if self.plt: self.plt.update()
-
-        for k in range(self.nsp):
-            self.y[k] = self.data[k+Y_LOC,n]
+        self.y[:] = self.data.massFractions(n)
 
         self.top.thermo.checkTPBoxes()
         self.mix.setMass(self.y)
@@ -285,16 +374,13 @@ class DataFrame(Frame):
     def newplot(self,e=0):
         loc = self.loc.get()
         self.zdata = self.data[0,:]
-        self.ydata = self.data[loc,:]
+        # a copy, since the data may be a read-only memory map
+        self.ydata = np.array(self.data[loc,:])
         npts = len(self.zdata)
 
         ylog = 0
         if loc >= Y_LOC:
-            for n in range(npts):
-                if self.ydata[n] <= 0.0:
-                    #print n, self.ydata[n]
-                    self.ydata[n] = 1.0e-20
-            self.ydata = np.log10(self.ydata)
+            self.ydata = np.log10(np.maximum(self.ydata, 1.0e-20))
             ylog = 1
 
         self.gdata = []
@@ -316,9 +402,9 @@ class DataFrame(Frame):
             self.gdot = self.plt.plot(n,'red')
 
     def updateplot(self,event=None):
-        if self.data == None: return
+        if self.data is None: return
 
-        if self.zdata == None:
+        if self.zdata is None:
             self.newplot()
 
         n = self.n.get()
@@ -327,6 +413,11 @@ class DataFrame(Frame):
             self.plt.delete(self.gdot)
             self.gdot = self.plt.plot(n,'red')
 
+        # moving the grid point slider sets the mixture state as it goes;
+        # the windows are refreshed once per idle cycle by the scheduler
+        if event is not None:
+            self.updateState()
+
 
     def plotLimits(self, xy):
         ymax = -1.e10
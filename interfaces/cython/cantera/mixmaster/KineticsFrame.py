@@ -7,30 +7,68 @@ import os, math, sys
 
 if sys.version_info[0] == 3:
     from tkinter import *
+    import queue
 else:
     from Tkinter import *
+    import Queue as queue
 
 from cantera import *
+import numpy as np
 
-from .SpeciesInfo import SpeciesInfo
+from .lru import LRUCache
+from .rxnpath import PathWorker
+from . import ranking
+from .SpeciesGrid import SpeciesGrid
 import webbrowser
 
 _CUTOFF = 1.e-15
 _ATOL = 1.e-15
 _RTOL = 1.e-7
 
-def showsvg():
-    f = open('_rp_svg.html','w')
-    f.write('<embed src="rxnpath.svg" name="rxnpath" height=500\n')
+# interval in ms at which finished reaction path diagrams are collected
+_POLL = 100
+
+# rows shown at once in the reaction table
+_NROWS = 30
+
+# orderings of the reaction table; None is index order
+_RANKINGS = [None, ranking.RATE, ranking.HEAT, ranking.SPECIES]
+
+# reaction equations, per mechanism
+_equations = LRUCache(maxitems=4)
+
+def equations(g, key=None):
+    """Reaction equations of g as an array of strings.
+
+    The equations are generated once per mechanism; key is the mechanism
+    key of g if known.
+    """
+    if key is None:
+        key = id(g)
+    eqs = _equations.get(key)
+    if eqs is None:
+        if hasattr(g, 'reaction_equations'):
+            eqs = g.reaction_equations()
+        else:
+            eqs = [g.reaction_equation(n) for n in range(g.n_reactions)]
+        eqs = np.array(eqs, dtype=object)
+        _equations.put(key, eqs)
+    return eqs
+
+def showsvg(image):
+    html = os.path.splitext(image)[0] + '_svg.html'
+    f = open(html,'w')
+    f.write('<embed src="'+os.path.basename(image)+'" name="rxnpath" height=500\n')
     f.write('type="image/svg-xml" pluginspage="http://www.adobe.com/svg/viewer/install/">\n')
     f.close()
-    webbrowser.open('file:///'+os.getcwd()+'/_rp_svg.html')
+    webbrowser.open('file:///'+html)
 
-def showpng():
-    f = open('_rp_png.html','w')
-    f.write('<img src="rxnpath.png" height=500/>\n')
+def showpng(image):
+    html = os.path.splitext(image)[0] + '_png.html'
+    f = open(html,'w')
+    f.write('<img src="'+os.path.basename(image)+'" height=500/>\n')
     f.close()
-    webbrowser.open('file:///'+os.getcwd()+'/_rp_png.html')
+    webbrowser.open('file:///'+html)
 
 
 class KineticsFrame(Frame):
@@ -43,6 +81,8 @@ class KineticsFrame(Frame):
         self.hide.set(0)
         self.comp = IntVar()
         self.comp.set(2)
+        self.ranked = IntVar()
+        self.ranked.set(0)
         self.controls.grid(column=1,row=0,sticky=W+E+N)
         self.makeControls()
         mf = self.master
@@ -57,6 +97,12 @@ class KineticsFrame(Frame):
         Radiobutton(self.controls,text='Net Production Rates',
                     variable=self.comp,value=2,
                     command=self.show).grid(column=0,row=2,sticky=W)
+        Checkbutton(self.controls,text='Largest First',
+                    variable=self.ranked,onvalue=1,offvalue=0,
+                    command=self.rank).grid(column=0,row=3,sticky=W)
+
+    def rank(self):
+        self.master.table.setRanked(self.ranked.get())
 
     def show(self):
         mf = self.master
@@ -79,15 +125,7 @@ class KineticsFrame(Frame):
             mf.comp = g.net_production_rates
             #mf.data = spdict(mix,mix,mf.comp)
 
-        for s in mf.variable.keys():
-            try:
-                k = g.species_index(s)
-                if mf.comp[k] > _CUTOFF or -mf.comp[k] > _CUTOFF:
-                    mf.variable[s].set(mf.comp[k])
-                else:
-                    mf.variable[s].set(0.0)
-            except:
-                pass
+        mf.table.setValues(mf.comp)
 
 class SpeciesKineticsFrame(Frame):
     def __init__(self,master,top):
@@ -96,7 +134,6 @@ class SpeciesKineticsFrame(Frame):
         self.top = top
         self.top.kinetics = self
         self.g = self.top.mix.g
-        self.entries=Frame(self)
         self.var = StringVar()
         self.var.set("Net Production Rates")
         self.names = self.top.mix.speciesNames()
@@ -104,7 +141,7 @@ class SpeciesKineticsFrame(Frame):
         self.comp = [0.0]*self.nsp
         self.makeControls()
         self.makeEntries()
-        self.entries.bind('<Double-l>',self.minimize)
+        self.table.bind('<Double-l>',self.minimize)
         self.ctype = 0
 
     def makeControls(self):
@@ -117,74 +154,30 @@ class SpeciesKineticsFrame(Frame):
         self.c.show()
 
     def redo(self):
-        self.update()
-        self.entries.destroy()
-        self.entries=Frame(self)
-        self.makeEntries()
+        self.table.setHide(self.c.hide.get())
 
     def minimize(self,Event=None):
         self.c.hide.set(1)
         self.redo()
         self.c.grid_forget()
-        self.entries.bind("<Double-1>",self.maximize)
+        self.table.bind("<Double-1>",self.maximize)
 
     def maximize(self,Event=None):
         self.c.hide.set(0)
         self.redo()
         self.c.grid(column=1,row=0,sticky=E+W+N+S)
-        self.entries.bind("<Double-1>",self.minimize)
-
-    def up(self, x):
-        self.update()
+        self.table.bind("<Double-1>",self.minimize)
 
     def makeEntries(self):
-        self.entries.grid(row=0,column=0,sticky=W+N+S+E)
-        self.entries.config(relief=FLAT,bd=4)
-        DATAKEYS = self.top.species
-        self.variable = {}
-
-        n=0
-        ncol = 3
-        col = 0
-        row = 60
-
-        for sp in DATAKEYS:
-            s = sp
-            k = s.index
-            if row > 15:
-                row = 0
-                col += 2
-                l = Label(self.entries,text='Species')
-                l.grid(column=col,row=row,sticky=E+W)
-                e1 = Entry(self.entries)
-                e1.grid(column=col+1,row=row,sticky=E+W)
-                e1['textvariable'] = self.var
-                e1.config(state=DISABLED)
-                e1.config(bg='lightyellow',relief=RIDGE)
-                row += 1
-
-            spname = s.name
-            val = self.comp[k]
-            if not self.c.hide.get() or val: showit = 1
-            else:  showit = 0
-
-            l=SpeciesInfo(self.entries,species=s,
-                          text=spname,relief=FLAT,justify=RIGHT,
-                          fg='darkblue')
-            entry1 = Entry(self.entries)
-            self.variable[spname] = DoubleVar()
-            self.variable[spname].set(self.comp[k])
-            entry1['textvariable']=self.variable[spname]
-            entry1.bind('<Any-Leave>',self.up)
-            if showit:
-                l.grid(column= col ,row=row,sticky=E)
-                entry1.grid(column=col+1,row=row)
-                n += 1
-                row += 1
-                entry1.config(state=DISABLED,bg='lightgray')
+        self.table = SpeciesGrid(self, self.top.species, self.var,
+                                 nrows=15, editable=0)
+        self.table.grid(row=0,column=0,sticky=W+N+S+E)
+        self.table.setValues(self.comp)
 
 
 class ReactionKineticsFrame(Frame):
+    """Table of reaction rates of progress, _NROWS at a time, in index
+    order or ranked (see ranking)."""
     def __init__(self,vis,top):
         self.master = Toplevel()
         self.master.protocol("WM_DELETE_WINDOW",self.hide)
@@ -194,91 +187,133 @@ class ReactionKineticsFrame(Frame):
         self.top = top
         self.g = self.top.mix.g
         nr = self.g.n_reactions
-        self.eqs=Text(self,width=40,height=30)
+        self.equations = equations(self.g, self.top.mechkey)
+        self.order = np.arange(nr)
+        self.rates = None
+        self.eqs=Text(self,width=40,height=_NROWS)
         self.data = []
         self.start = DoubleVar()
-        if nr > 30:
-            self.end = self.start.get()+30
-        else:
-            self.end = self.start.get()+nr
+        self.sortby = IntVar()
+        self.sortby.set(0)
+        self.minrop = StringVar()
+        self.ntop = StringVar()
+        self.species = StringVar()
 
         for i in range(4):
-            self.data.append(Text(self,width=15,height=30))
+            self.data.append(Text(self,width=15,height=_NROWS))
 
-        for n in range(nr):
-            s = self.g.reaction_equation(n)
-            self.eqs.insert(END,s+'\n')
         self.eqs.grid(column=0,row=1,sticky=W+E+N)
         for i in range(4):
             self.data[i].grid(column=i+1,row=1,sticky=W+E+N)
+        for w in [self.eqs] + self.data:
+            w.bind('<MouseWheel>', self.wheel)
+            w.bind('<Button-4>', self.wheel)
+            w.bind('<Button-5>', self.wheel)
         Label(self, text='Reaction').grid(column=0,row=0,sticky=W+E+N)
         Label(self, text='Fwd ROP').grid(column=1,row=0,sticky=W+E+N)
         Label(self, text='Rev ROP').grid(column=2,row=0,sticky=W+E+N)
         Label(self, text='Net ROP').grid(column=3,row=0,sticky=W+E+N)
         Label(self, text='Kp').grid(column=4,row=0,sticky=W+E+N)
 
+        cframe = Frame(self)
+        cframe.config(relief=GROOVE,bd=4)
+        Label(cframe,text='Order').grid(column=0,row=0,sticky=W)
+        Radiobutton(cframe,text='Index',variable=self.sortby,value=0,
+                    command=self.show).grid(column=1,row=0,sticky=W)
+        Radiobutton(cframe,text='|Net ROP|',variable=self.sortby,value=1,
+                    command=self.show).grid(column=2,row=0,sticky=W)
+        Radiobutton(cframe,text='Heat Release',variable=self.sortby,value=2,
+                    command=self.show).grid(column=3,row=0,sticky=W)
+        Radiobutton(cframe,text='Production of',variable=self.sortby,
+                    value=3,command=self.show).grid(column=4,row=0,sticky=W)
+        e = Entry(cframe,textvariable=self.species,width=12)
+        e.grid(column=5,row=0,sticky=W)
+        e.bind('<Return>',self.show)
+        Label(cframe,text='Min |Net ROP|').grid(column=0,row=1,sticky=W)
+        e = Entry(cframe,textvariable=self.minrop,width=12)
+        e.grid(column=1,row=1,columnspan=2,sticky=W)
+        e.bind('<Return>',self.show)
+        Label(cframe,text='Show Top').grid(column=3,row=1,sticky=E)
+        e = Entry(cframe,textvariable=self.ntop,width=12)
+        e.grid(column=4,row=1,sticky=W)
+        e.bind('<Return>',self.show)
+        cframe.grid(column=0,row=2,columnspan=5,sticky=W+E)
+
         self.scfr = Frame(self)
         self.scfr.config(relief=GROOVE,bd=4)
 
-##              self.sc = Scrollbar(self.scfr,command=self.show,
-##                              variable = self.start,
-##                              orient='horizontal',length=400)
-        self.sc = Scale(self.scfr,command=self.show,
+        self.sc = Scale(self.scfr,command=self.draw,
                         variable=self.start,
                         orient='vertical',length=400)
-#               self.sc.config(cnf={'from':0,'to':nr},variable = self.start)
-        #self.sc.bind('<Any-Enter>',self.couple)
-        #self.scfr.bind('<Any-Leave>',self.decouple)
+        self.sc.config(cnf={'from':0,'to':max(0, nr - _NROWS)})
         self.sc.pack(side=RIGHT,fill=Y)
         self.scfr.grid(row=0,column=6,rowspan=10,sticky=N+E+W)
         self.grid(column=0,row=0)
 
         self.hide()
 
-##      def decouple(self,event=None):
-##              d = DoubleVar()
-##              xx = self.start.get()
-##              d.set(xx)
-##              self.sc.config(variable = d)
-
-##      def couple(self,event=None):
-##              self.sc.config(variable = self.start)
-
     def hide(self):
 #               self.vis.set(0)
         self.master.withdraw()
 
     def show(self,e=None,b=None,c=None):
-        v = self.vis.get()
-        print(e,b,c)
-        #if v == 0:
-        #       self.hide()
-        #       return
-
+        """Evaluate the rates for the current state and redraw."""
         self.master.deiconify()
-        nr = self.g.n_reactions
         frop = self.g.forward_rates_of_progress
         rrop = self.g.reverse_rates_of_progress
         kp = self.g.equilibrium_constants
-        self.data[0].delete(1.0,END)
-        self.data[1].delete(1.0,END)
-        self.data[2].delete(1.0,END)
-        self.data[3].delete(1.0,END)
-        self.eqs.delete(1.0,END)
+        self.rates = (frop, rrop, frop - rrop, kp)
+        self.sort()
+        self.draw()
+
+    def sort(self):
+        net = abs(self.rates[2])
+        try:
+            minrop = float(self.minrop.get())
+        except ValueError:
+            minrop = None
+        if minrop is None:
+            order = np.arange(len(net))
+        else:
+            order = np.nonzero(net >= minrop)[0]
 
+        by = _RANKINGS[self.sortby.get()]
+        if by is not None:
+            try:
+                score = ranking.contributions(self.g, by, self.species.get(),
+                                              self.top.mechkey)
+            except (ValueError, CanteraError):
+                # no such species
+                score = self.rates[2]
+            try:
+                ntop = int(self.ntop.get())
+            except ValueError:
+                ntop = None
+            order = order[ranking.top(abs(score[order]), ntop)]
+        self.order = order
+        self.sc.config(cnf={'from':0,'to':max(0, len(order) - _NROWS)})
+
+    def draw(self, e=None):
+        """Redraw the visible rows, one insert per column."""
+        if self.rates is None:
+            return
         n0 = int(self.start.get())
-        nn = nr - n0
-        if nn > 30: nn = 30
-        for n in range(n0, nn+n0):
-            s = '%12.5e \n' % (frop[n],)
-            self.data[0].insert(END,s)
-            s = '%12.5e \n' % (rrop[n],)
-            self.data[1].insert(END,s)
-            s = '%12.5e \n' % (frop[n] - rrop[n],)
-            self.data[2].insert(END,s)
-            s = '%12.5e \n' % (kp[n],)
-            self.data[3].insert(END,s)
-            self.eqs.insert(END, self.g.reaction_equation(n)+'\n')
+        rows = self.order[n0:n0 + _NROWS]
+        for w, x in zip(self.data, self.rates):
+            w.delete(1.0,END)
+            w.insert(END, '\n'.join(np.char.mod('%12.5e ', x[rows])))
+        self.eqs.delete(1.0,END)
+        self.eqs.insert(END, '\n'.join(self.equations[rows]))
+
+    def wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            step = -1
+        else:
+            step = 1
+        n0 = int(self.start.get()) + step
+        self.start.set(max(0, min(n0, len(self.order) - _NROWS)))
+        self.draw()
+        return 'break'
 
 class ReactionPathFrame(Frame):
 
@@ -343,6 +378,11 @@ class ReactionPathFrame(Frame):
         Checkbutton(fmtframe, text = 'Display in Web Browser',
                     variable=self.browser,
                     command=self.show).grid(column=0,columnspan=6,row=0)
+        self.inproc = IntVar()
+        self.inproc.set(0)
+        Checkbutton(fmtframe, text = 'Draw Fluxes Without Graphviz',
+                    variable=self.inproc,
+                    command=self.show).grid(column=6,columnspan=4,row=0)
         Label(fmtframe,text='Format').grid(column=0,row=1,sticky=W)
         for e in ['svg', 'png', 'gif', 'jpg']:
             Radiobutton(fmtframe,text=e,
@@ -363,6 +403,12 @@ class ReactionPathFrame(Frame):
                                                  row=1,sticky=W)
         pframe.grid(row=6,column=0,columnspan=10,sticky=E+W)
 
+        self.status = StringVar()
+        Label(self,textvariable=self.status,
+              fg='darkblue').grid(row=7,column=0,columnspan=10,sticky=W)
+        self.worker = PathWorker(self.top.pathname)
+        self.polling = 0
+
         self.thresh.set(-2.0)
         self.hide()
 
@@ -370,51 +416,86 @@ class ReactionPathFrame(Frame):
         #self.vis.set(0)
         self.master.withdraw()
 
-    def show(self,e=None):
+    def destroy(self):
+        self.worker.stop()
+        Frame.destroy(self)
 
+    def show(self,e=None):
+        """Request a new diagram; it is displayed by poll() when ready."""
         self.master.deiconify()
-        el = self.g.element_name(self.el.get())
         det = False
         if self.detailed.get() == 1: det = True
         flow = 'OneWayFlow'
         if self.net.get() == 1: flow = 'NetFlow'
 
-        self.d = ReactionPathDiagram(self.g, el)
-        self.d.arrow_width = -2
-        self.d.flow_type = flow
-        self.d.show_details = det
-        self.d.threshold = math.pow(10.0, self.thresh.get())
-        node = self.local.get()
-        try:
-            k = self.g.species_index(node)
-            self.d.display_only(k)
-        except:
-            self.d.display_only(-1)
-
-        self.d.write_dot('rxnpath.dot')
-
-        if self.browser.get() == 1:
+        # the worker builds the diagram on its own Solution, so only a
+        # snapshot of the state is passed to it
+        request = {'mechkey': self.top.mechkey,
+                   'element': self.g.element_name(self.el.get()),
+                   'threshold': math.pow(10.0, self.thresh.get()),
+                   'flow': flow,
+                   'details': det,
+                   'species': self.local.get().strip(),
+                   'state': self.g.TPX}
+        if self.inproc.get() == 1:
+            request['matrix'] = 1
+        elif self.browser.get() == 1:
             fmt = self.fmt.get()
-            os.system('dot -T'+fmt+' rxnpath.dot > rxnpath.'+fmt)
-            if fmt == 'svg': showsvg()
-            elif fmt == 'png': showpng()
+            request['command'] = 'dot -T'+fmt+' rxnpath.dot > rxnpath.'+fmt
+            request['image'] = 'rxnpath.'+fmt
+            request['format'] = fmt
+        else:
+            request['command'] = self.dot.get()
+            request['image'] = 'rxnpath.gif'
+        self.worker.submit(request)
+        self.status.set('Rendering...')
+        if not self.polling:
+            self.polling = 1
+            self.after(_POLL, self.poll)
+
+    def poll(self):
+        latest = None
+        while True:
+            try:
+                gen, result, err = self.worker.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.worker.current(gen):
+                latest = (result, err)
+        if latest:
+            self.status.set('')
+            result, err = latest
+            if err is not None:
+                self.status.set('Error: '+str(err))
+            elif result is not None:
+                self.display(result)
+            self.polling = 0
+        else:
+            self.after(_POLL, self.poll)
+
+    def display(self, result):
+        self.cv.delete('flux')
+        fmt = result['format']
+        if 'matrix' in result:
+            self.drawFluxes(result['matrix'])
+        elif fmt:
+            if fmt == 'svg': showsvg(result['image'])
+            elif fmt == 'png': showpng(result['image'])
             else:
-                path = 'file:///'+os.getcwd()+'/rxnpath.'+fmt
-                webbrowser.open(path)
+                webbrowser.open('file:///'+result['image'])
             try:
                 self.cv.delete(self.image)
             except:
                 pass
             self.cv.configure(width=0, height=0)
         else:
-            os.system(self.dot.get())
             self.rp = None
             try:
                 self.cv.delete(self.image)
             except:
                 pass
             try:
-                self.rp = PhotoImage(file='rxnpath.gif')
+                self.rp = PhotoImage(file=result['image'])
                 self.cv.configure(width=self.rp.width(),
                                   height=self.rp.height())
 
@@ -422,3 +503,41 @@ class ReactionPathFrame(Frame):
                                                   image=self.rp)
             except:
                 pass
+
+    def drawFluxes(self, m, size=500):
+        """Draw a FluxMatrix on the canvas, with the species on a circle."""
+        try:
+            self.cv.delete(self.image)
+        except:
+            pass
+        self.cv.configure(width=size, height=size)
+        nodes = np.unique(np.concatenate((m.row, m.col)))
+        if not len(nodes):
+            return
+        c = 0.5*size
+        r = 0.4*size
+        theta = 2.0*math.pi*np.arange(len(nodes))/len(nodes)
+        pos = dict((k, (c + r*math.cos(t), c + r*math.sin(t)))
+                   for k, t in zip(nodes, theta))
+        fmax = m.data.max()
+        # smallest first, so that the largest fluxes are drawn on top
+        for i, j, f in reversed(m.edges()):
+            x0, y0 = pos[i]
+            x1, y1 = pos[j]
+            dx, dy = x1 - x0, y1 - y0
+            d = math.hypot(dx, dy) or 1.0
+            # stop short of the labels, and offset the two directions of
+            # a pair to either side
+            s = min(20.0, 0.3*d)/d
+            nx, ny = -3.0*dy/d, 3.0*dx/d
+            if f >= 0.1*fmax: color = 'darkblue'
+            else: color = 'gray'
+            self.cv.create_line(x0 + s*dx + nx, y0 + s*dy + ny,
+                                x1 - s*dx + nx, y1 - s*dy + ny,
+                                arrow=LAST, width=1.0 + 5.0*f/fmax,
+                                fill=color, tags='flux')
+        names = self.g.species_names
+        for k in nodes:
+            x, y = pos[k]
+            self.cv.create_text(x, y, text=names[k], fill='black',
+                                tags='flux')
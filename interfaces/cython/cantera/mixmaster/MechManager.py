@@ -1,18 +1,23 @@
 # This file is part of Cantera. See License.txt in the top-level directory or
 # at http://www.cantera.org/license.txt for license and copyright information.
 
-from cantera import *
-
 import sys
 if sys.version_info[0] == 3:
     from tkinter import *
 else:
     from Tkinter import *
 
+if sys.version_info[0] == 3:
+    import queue
+else:
+    import Queue as queue
+
 from .ControlPanel import ControlWindow
 from .ControlPanel import make_menu, menuitem_state, add_menu_item
+from .lru import LRUCache
 #from Cantera.Examples.Tk import _mechdir
 import os
+import threading
 
 # automatically-loaded mechanisms
 _autoload = [
@@ -21,6 +26,17 @@ _autoload = [
     (' H/O/Ar', 'h2o2.cti')
     ]
 
+# maximum number of mechanisms kept loaded at once
+_MAXLIVE = 4
+
+# interval in ms at which the Tk thread checks for loaded mechanisms
+_POLL = 100
+
+# Tk may only be used from the thread running the main loop. Work done on
+# worker threads (loading mechanisms here, reading data files, rendering
+# reaction path diagrams) must not touch Tk objects; results are passed
+# back through a queue that the Tk thread polls with after().
+
 def testit():
     pass
 
@@ -49,18 +65,130 @@ class MechManager(Frame):
         self.mechmenu = make_menu('Mixtures', self, self.mlist)
         self.mechmenu.grid(row=0,column=0,sticky=W)
 
+        self.progress = StringVar()
+        Label(self, textvariable=self.progress,
+              fg='darkblue').grid(row=0,column=1,sticky=W)
+
+        # The menu lists (name, pathname) descriptors. Solution objects are
+        # only created when a mechanism is selected, and at most _MAXLIVE
+        # of them are kept; the mixture state of every mechanism switched
+        # away from is kept in self.snapshots.
+        self.live = LRUCache(maxitems=_MAXLIVE)
+        self.snapshots = {}
+        self.current = 0
+
+        # mechanisms are parsed on worker threads and handed to the Tk
+        # thread through this queue
+        self.loaded = queue.Queue()
+        self.pending = 0
+        self.loading = set()
+
         self.mfr = None
 
-    def addMechanism(self, name, mech):
-        self.mechanisms.append((name, mech))
+    def addMechanism(self, name, pathname, select=1, mech=None, key=None):
+        """Add a mechanism to the menu.
+
+        If mech is given it is the already-loaded Solution for pathname;
+        otherwise the file is only parsed when the mechanism is selected.
+        """
+        if not name:
+            name = os.path.splitext(os.path.basename(pathname))[0]
+        self.mechanisms.append((name, pathname))
         il = len(self.mechanisms)
         self.mlist[-1] = (name, self.setMechanism, 'check', self.mechindx, il)
-        add_menu_item(list(self.mechmenu.children.values())[0], self.mlist[-1])
+        menu = list(self.mechmenu.children.values())[0]
+        # add_menu_item clears the check variable, so restore it
+        i = self.mechindx.get()
+        add_menu_item(menu, self.mlist[-1])
         self.mlist.append([])
-
-        self.mechindx.set(il)
+        self.mechindx.set(i)
         self.mechmenu.grid(row=0,column=0,sticky=W)
 
+        if mech is not None:
+            self.live.put(pathname, (mech, key))
+        if select:
+            self.select(il)
+
+    def select(self, i):
+        """Make mechanism i (counting from 1) the current mechanism."""
+        self.mechindx.set(i)
+        name, pathname = self.mechanisms[i-1]
+        live = self.live.get(pathname)
+        if live:
+            self.activate(i, live[0], live[1])
+        else:
+            self.load(i)
+
+    def activate(self, i, mech, key):
+        if self.app.mech:
+            self.snapshot()
+        name, pathname = self.mechanisms[i-1]
+        self.current = i
+        self.app.setmech(mech, key, pathname,
+                         self.snapshots.get(pathname))
+        self.app.enableMixMenus(1)
+
+    def snapshot(self):
+        """Save the composition, T and P of the current mixture."""
+        if self.current:
+            pathname = self.mechanisms[self.current-1][1]
+            mix = self.app.mix
+            self.snapshots[pathname] = (mix.moles().copy(), mix.g.T, mix.g.P)
+
+    def load(self, i):
+        """Parse mechanism i on a worker thread."""
+        if i in self.loading:
+            return
+        self.loading.add(i)
+        if self.pending == 0:
+            self.after(_POLL, self.poll)
+        self.pending += 1
+        self.showProgress()
+        t = threading.Thread(target=self._load,
+                             args=(i, self.mechanisms[i-1][1]))
+        t.daemon = True
+        t.start()
+
+    def _load(self, i, pathname):
+        # Cantera is first imported here, off the Tk thread
+        mech = key = err = None
+        try:
+            from . import mechcache
+            from .thermocache import mechanismKey
+            mech, key = mechcache.load(pathname)
+            if key is None:
+                key = mechanismKey(pathname, mech)
+        except Exception as e:
+            err = e
+        self.loaded.put((i, mech, key, err))
+
+    def poll(self):
+        while True:
+            try:
+                i, mech, key, err = self.loaded.get_nowait()
+            except queue.Empty:
+                break
+            self.pending -= 1
+            self.loading.discard(i)
+            name, pathname = self.mechanisms[i-1]
+            if err is not None:
+                self.app.loadError(pathname, err)
+                self.mechindx.set(self.current)
+                continue
+            self.live.put(pathname, (mech, key))
+            # the user may have picked another mechanism in the meantime
+            if self.mechindx.get() == i:
+                self.activate(i, mech, key)
+        self.showProgress()
+        if self.pending > 0:
+            self.after(_POLL, self.poll)
+
+    def showProgress(self):
+        if self.pending > 0:
+            names = [self.mechanisms[i-1][0].strip() for i in self.loading]
+            self.progress.set('Loading ' + ', '.join(sorted(names)) + '...')
+        else:
+            self.progress.set('')
 
     def delMechanism(self, mech):
         self.mechanisms.remove(mech)
@@ -84,7 +212,4 @@ class MechManager(Frame):
 
 
     def setMechanism(self, event=None):
-        i = self.mechindx.get()
-        self.app.mech = self.mechanisms[i-1][1]
-        self.app.makeMix()
-        self.app.makeWindows()
+        self.select(self.mechindx.get())
@@ -3,7 +3,8 @@
 
 from cantera import gas_constant
 from numpy import zeros, ones
-from .utilities import handleError
+import numpy as np
+from .lru import LRUCache
 
 def spdict(phase, x):
     nm = phase.speciesNames()
@@ -12,22 +13,120 @@ def spdict(phase, x):
         data[nm[k]] = x[k]
     return data
 
-class Species:
-    def __init__(self,g,name):
+def _nasa7(coeffs, t):
+    """Evaluate NASA 7-coefficient polynomials for several species at once.
+
+    ``coeffs`` has one row per species in the layout used by
+    ``NasaPoly2.coeffs`` (Tmid, 7 high-T coefficients, 7 low-T
+    coefficients). Returns cp/R, h/RT and s/R with shape (nsp, nt).
+    """
+    high = t > coeffs[:,0:1]
+    a = np.where(high, coeffs.T[1:8,:,np.newaxis], coeffs.T[8:15,:,np.newaxis])
+    t2 = t*t
+    t3 = t2*t
+    t4 = t3*t
+    cp = a[0] + a[1]*t + a[2]*t2 + a[3]*t3 + a[4]*t4
+    h = (a[0] + a[1]*t/2.0 + a[2]*t2/3.0 + a[3]*t3/4.0 + a[4]*t4/5.0
+         + a[5]/t)
+    s = (a[0]*np.log(t) + a[1]*t + a[2]*t2/2.0 + a[3]*t3/3.0
+         + a[4]*t4/4.0 + a[6])
+    return cp, h, s
+
+def _constcp(coeffs, t):
+    """Evaluate constant-cp parameterizations (T0, h0, s0, cp0 rows)."""
+    t0 = coeffs[:,0:1]
+    h0, s0, cp0 = [coeffs[:,n:n+1]/gas_constant for n in range(1,4)]
+    cp = cp0*np.ones_like(t)
+    h = (h0 + cp0*(t - t0))/t
+    s = s0 + cp0*np.log(t/t0)
+    return cp, h, s
+
+def speciesThermo(g, t, species=None):
+    """Non-dimensional standard-state properties of species in phase g.
+
+    Returns the tuple (cp/R, h/RT, s/R) evaluated at the temperatures in
+    ``t`` directly from each species' thermo parameterization, so the state
+    of ``g`` is never modified. ``species`` may be a species name or index,
+    or a sequence of them; by default all species are evaluated. For a
+    single species the arrays have the shape of ``t``; otherwise they have
+    shape (number of species, len(t)).
+    """
+    t = np.asarray(t, dtype=float)
+    single = species is not None and np.ndim(species) == 0
+    if species is None:
+        kk = range(g.n_species)
+    elif single:
+        kk = [species]
+    else:
+        kk = species
+    kk = [k if isinstance(k, (int, np.integer)) else g.species_index(k)
+          for k in kk]
+
+    tt = np.atleast_1d(t).ravel()
+    cp = np.empty((len(kk), len(tt)))
+    h = np.empty_like(cp)
+    s = np.empty_like(cp)
+
+    # group species by parameterization so that the common cases are
+    # evaluated for all species in one pass
+    groups = {}
+    other = []
+    for n, k in enumerate(kk):
+        thermo = g.species(k).thermo
+        kind = type(thermo).__name__
+        if kind in ('NasaPoly2', 'ConstantCp'):
+            groups.setdefault(kind, ([], []))
+            groups[kind][0].append(n)
+            groups[kind][1].append(thermo.coeffs)
+        else:
+            other.append((n, thermo))
+
+    for kind, (rows, coeffs) in groups.items():
+        coeffs = np.array(coeffs)
+        if kind == 'NasaPoly2':
+            cp[rows], h[rows], s[rows] = _nasa7(coeffs, tt)
+        else:
+            cp[rows], h[rows], s[rows] = _constcp(coeffs, tt)
+
+    # any other parameterization is evaluated point by point through the
+    # species thermo object, which still leaves the phase untouched
+    for n, thermo in other:
+        for j, tj in enumerate(tt):
+            cp[n,j] = thermo.cp(tj)/gas_constant
+            h[n,j] = thermo.h(tj)/(gas_constant*tj)
+            s[n,j] = thermo.s(tj)/gas_constant
+
+    if single:
+        shape = t.shape
+        return cp[0].reshape(shape), h[0].reshape(shape), s[0].reshape(shape)
+    shape = (len(kk),) + t.shape
+    return cp.reshape(shape), h.reshape(shape), s.reshape(shape)
+
+
+class Species(object):
+    __slots__ = ('g', 'mechkey', 'name', 'symbol', 'index', 'minTemp',
+                 'maxTemp', 'molecularWeight', 'c', 'e', 'hf0')
+
+    def __init__(self,g,name,hf0=None,mechkey=None,index=None,
+                 molecularWeight=None):
         self.g = g
-        t = g.T
-        p = g.P
-        x = g.X
+        self.mechkey = mechkey
         self.name = name
         self.symbol = name
-        self.index = g.species_index(name)
-        self.minTemp = g.species(name).thermo.min_temp
-        self.maxTemp = g.species(name).thermo.max_temp
-        self.molecularWeight = g.molecular_weights[self.index]
+        if index is None:
+            index = g.species_index(name)
+        self.index = index
+        thermo = g.species(index).thermo
+        self.minTemp = thermo.min_temp
+        self.maxTemp = thermo.max_temp
+        if molecularWeight is None:
+            molecularWeight = g.molecular_weights[index]
+        self.molecularWeight = molecularWeight
         self.c = []
         self.e = g.element_names
-        self.hf0 = self.enthalpy_RT(298.15)*gas_constant*298.15
-        g.TPX = t,p,x
+        if hf0 is None:
+            hf0 = self.enthalpy_RT(298.15)*gas_constant*298.15
+        self.hf0 = hf0
         for n in range(len(self.e)):
             na = g.n_atoms(self.index, n)
             if na > 0:
@@ -36,51 +135,151 @@ class Species:
     def composition(self):
         return self.c
 
+    def thermo(self,t):
+        """Return (cp/R, h/RT, s/R) at temperature(s) t."""
+        return speciesThermo(self.g, t, self.index)
+
     def enthalpy_RT(self,t):
-        self.g.TP = t, None
-        return self.g.partial_molar_enthalpies[self.index] / (gas_constant*t)
+        return float(self.thermo(t)[1])
 
     def cp_R(self,t):
-        self.g.TP = t, None
-        return self.g.standard_cp_R[self.index]
+        return float(self.thermo(t)[0])
 
     def entropy_R(self,t):
-        self.g.TP = t, None
-        return self.g.standard_entropies_R[self.index]
+        return float(self.thermo(t)[2])
+
+class SpeciesList(object):
+    """Sequence of the Species records of phase g.
+
+    Names and molecular weights are read from the phase arrays up front;
+    each Species record is only constructed when it is first accessed.
+    """
+    def __init__(self, g, mechkey=None):
+        self.g = g
+        self.mechkey = mechkey
+        self.names = g.species_names
+        self.wt = g.molecular_weights
+        self._hf0 = None
+        self._items = [None]*len(self.names)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return [self[n] for n in range(*k.indices(len(self)))]
+        # Cantera only accepts Python ints as species indices
+        k = int(k)
+        sp = self._items[k]
+        if sp is None:
+            if self._hf0 is None:
+                from .thermocache import thermoCache
+                self._hf0 = thermoCache.hf0(self.mechkey, self.g)
+            if k < 0:
+                k += len(self)
+            sp = Species(self.g, self.names[k], self._hf0[k], self.mechkey,
+                         k, self.wt[k])
+            self._items[k] = sp
+        return sp
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+
+# state properties accepted as keyword arguments by Mix.set, and the pairs
+# of them that fix the state, in the order they are tried
+properties = ('temperature', 'pressure', 'density', 'intEnergy',
+              'enthalpy', 'entropy')
+statePairs = (('temperature', 'pressure'), ('temperature', 'density'),
+              ('pressure', 'entropy'), ('pressure', 'enthalpy'),
+              ('density', 'entropy'), ('density', 'intEnergy'))
+
+def findPair(given):
+    """Return the first state pair whose properties are both in given."""
+    for pair in statePairs:
+        if pair[0] in given and pair[1] in given:
+            return pair
+    return None
+
+# equilibrium option for each state property pair
+_EQUIL = {'TP':'TP', 'TD':'TV', 'HP':'HP', 'SP':'SP', 'SV':'SV', 'UV':'UV'}
+
+class EquilCache:
+    """Equilibrium results keyed by mechanism, elements and property pair.
+
+    For each key the last ``maxpoints`` results are kept as (values,
+    TPX) entries; at most ``maxkeys`` keys are held, with LRU eviction.
+    """
+    def __init__(self, maxkeys=64, maxpoints=32, rtol=0.05):
+        self.maxpoints = maxpoints
+        self.rtol = rtol
+        self._cache = LRUCache(maxitems=maxkeys)
+
+    def lookup(self, key, values):
+        """Return (TPX, exact) for the nearest stored result, if any.
+
+        ``exact`` is true if the stored property values equal ``values``;
+        otherwise the nearest result within the relative tolerance is
+        returned as a starting estimate, or (None, False) if there is none.
+        """
+        points = self._cache.get(key)
+        if not points:
+            return None, False
+        values = np.asarray(values)
+        best, dmin = None, None
+        for v, tpx in points:
+            d = np.max(np.abs(v - values)/np.maximum(np.abs(values), 1e-300))
+            if d == 0.0:
+                return tpx, True
+            if d < self.rtol and (dmin is None or d < dmin):
+                best, dmin = tpx, d
+        return best, False
+
+    def store(self, key, values, tpx):
+        points = self._cache.get(key)
+        if points is None:
+            points = []
+            self._cache.put(key, points)
+        points.append((np.array(values), tpx))
+        del points[:-self.maxpoints]
+
+    def clear(self):
+        self._cache.clear()
+
+equilCache = EquilCache()
 
 class Mix:
-    def __init__(self,g):
+    def __init__(self,g,mechkey=None):
         self.g = g
+        self.mechkey = mechkey
+        self._atoms = None
         self._mech = g
         self.nsp = g.n_species
         self._moles = zeros(self.nsp,'d')
         self.wt = g.molecular_weights
+        self._names = g.species_names
+        self._index = dict((nm, k) for k, nm in enumerate(self._names))
 
     def setMoles(self, m):
-        self._moles = m
+        # a copy, since the mole array is updated in place
+        self._moles = np.array(m, dtype=float)
         self.g.X = self._moles
 
     def moles(self):
         return self._moles
 
     def totalMoles(self):
-        sum = 0.0
-        for k in range(self.nsp):
-            sum += self._moles[k]
-        return sum
+        return self._moles.sum()
 
     def totalMass(self):
-        sum = 0.0
-        for k in range(self.nsp):
-            sum += self._moles[k]*self.wt[k]
-        return sum
+        return np.dot(self._moles, self.wt)
+
+    def speciesIndex(self, name):
+        return self._index[name]
 
     def moleDict(self):
-        d = {}
-        nm = self.g.species_names
-        for e in range(self.nsp):
-            d[nm[e]] = self._moles[e]
-        return d
+        return dict(zip(self._names, self._moles.tolist()))
 
     def setMass(self, m):
         self.setMoles( m/self.wt)
@@ -89,53 +288,80 @@ class Mix:
         return self.wt*self._moles
 
     def speciesNames(self):
-        return self.g.species_names
+        return self._names
 
     def massDict(self):
-        d = {}
-        nm = self.g.species_names
-        for e in range(self.nsp):
-            d[nm[e]] = self._moles[e]*self.wt[e]
-        return d
+        return dict(zip(self._names, self.mass().tolist()))
 
     def set(self, temperature = None, pressure = None,
             density = None, enthalpy = None,
             entropy = None, intEnergy = None, equil = 0):
-        total_mass = self.totalMass()
+        """Set the state from a property pair; returns the pair set
+        (e.g. 'TP'), or None if no supported pair was given."""
+        if temperature is not None and pressure is not None:
+            prop, a, b = 'TP', temperature, pressure
 
-        if temperature and pressure:
-            self.g.TP = temperature, pressure
-            if equil:
-                self.g.equilibrate('TP')
-
-        elif temperature and density:
-            self.g.TD = temperature, density
-            if equil:
-                self.g.equilibrate('TV')
-
-        elif pressure and enthalpy:
-            self.g.HP = enthalpy, pressure
-            if equil:
-                self.g.equilibrate('HP')
-
-        elif pressure and entropy:
-            self.g.SP = entropy, pressure
-            if equil:
-                self.g.equilibrate('SP')
-
-        elif density and entropy:
-            self.g.SV = entropy, 1.0/density
-            if equil:
-                self.g.equilibrate('SV')
-
-        elif density and intEnergy:
-            self.g.UV = intEnergy, 1.0/density
-            if equil:
-                self.g.equilibrate('UV')
-
-#       else:
+        elif temperature is not None and density is not None:
+            prop, a, b = 'TD', temperature, density
+
+        elif pressure is not None and enthalpy is not None:
+            prop, a, b = 'HP', enthalpy, pressure
+
+        elif pressure is not None and entropy is not None:
+            prop, a, b = 'SP', entropy, pressure
+
+        elif density is not None and entropy is not None:
+            prop, a, b = 'SV', entropy, 1.0/density
+
+        elif density is not None and intEnergy is not None:
+            prop, a, b = 'UV', intEnergy, 1.0/density
+
+        else:
 #               handleError('unsupported property pair', warning=1)
+            return None
+
+        if equil:
+            self.equilibrate(prop, a, b)
+        else:
+            setattr(self.g, prop, (a, b))
+        return prop
+
+    def elementMoles(self):
+        """Moles of each element in the mixture."""
+        if self._atoms is None:
+            g = self.g
+            self._atoms = np.array([[g.n_atoms(k, m)
+                                     for m in range(g.n_elements)]
+                                    for k in range(self.nsp)])
+        return np.dot(self._moles, self._atoms)
+
+    def equilibrate(self, prop, a, b):
+        """Set the state with property pair prop = (a, b) and equilibrate.
+
+        Results are stored in the process-wide equilibrium cache. A result
+        for the same mechanism, element abundances and property pair is
+        reused directly if a and b match, or used as the starting estimate
+        if they are within the cache tolerance.
+        """
+        g = self.g
+        total_mass = self.totalMass()
+        key = None
+        exact = False
+        if self.mechkey is not None and self.totalMoles() > 0.0:
+            el = self.elementMoles()
+            el = np.round(el/el.sum(), 12)
+            key = (self.mechkey, prop, el.tobytes())
+            tpx, exact = equilCache.lookup(key, (a, b))
+            if tpx is not None:
+                # either the answer itself, or a nearby equilibrium state
+                # with the same elements to start the solver from
+                g.TPX = tpx
 
+        if not exact:
+            setattr(g, prop, (a, b))
+            g.equilibrate(_EQUIL[prop])
+            if key is not None:
+                equilCache.store(key, (a, b), g.TPX)
 
-        total_moles = total_mass/self.g.mean_molecular_weight
-        self._moles = self.g.X*total_moles
+        total_moles = total_mass/g.mean_molecular_weight
+        np.multiply(g.X, total_moles, out=self._moles)
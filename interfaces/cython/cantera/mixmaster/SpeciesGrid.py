@@ -0,0 +1,202 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+import sys
+
+if sys.version_info[0] == 3:
+    from tkinter import *
+else:
+    from Tkinter import *
+
+import numpy as np
+
+from .SpeciesInfo import SpeciesInfo
+from . import ranking
+
+_CUTOFF = 1.e-15
+
+class SpeciesGrid(Frame):
+    """A horizontally scrolling table of species names and values.
+
+    Widgets are created for only ``ncols`` columns of ``nrows`` species.
+    Scrolling rebinds these labels and entries to other species instead of
+    creating new ones, so the number of widgets does not depend on the
+    size of the mechanism. The values of all species are kept in the array
+    ``values``; the entries show the visible part of it.
+    """
+    def __init__(self, master, species, title, nrows=25, ncols=3,
+                 editable=1, onleave=None, onreturn=None):
+        Frame.__init__(self, master)
+        self.config(relief=FLAT, bd=4)
+        self.species = species
+        self.names = species.names
+        self.nsp = len(self.names)
+        self.nrows = nrows
+        self.ncols = max(1, min(ncols, -(-self.nsp // nrows)))
+        self.values = np.zeros(self.nsp)
+        self.hidezero = 0
+        self.ranked = 0
+        self.rows = np.arange(self.nsp)
+        self.first = 0
+
+        self.headers = []
+        self.slots = []
+        for col in range(self.ncols):
+            l = Label(self, text='Species')
+            e = Entry(self, textvariable=title)
+            e.config(state=DISABLED, bg='lightyellow', relief=RIDGE)
+            self.headers.append((l, e))
+            for row in range(nrows):
+                l = SpeciesInfo(self, species=species, spindex=0, text='',
+                                relief=FLAT, justify=RIGHT, fg='darkblue')
+                v = DoubleVar()
+                e = Entry(self, textvariable=v)
+                if onleave:
+                    e.bind('<Any-Leave>', onleave)
+                if onreturn:
+                    e.bind('<Return>', onreturn)
+                for w in (l, e):
+                    w.bind('<MouseWheel>', self.wheel, '+')
+                    w.bind('<Button-4>', self.wheel, '+')
+                    w.bind('<Button-5>', self.wheel, '+')
+                self.slots.append((l, e, v, 2*col, row + 1))
+        # index of the species shown in each slot, or -1 if it is empty
+        self.shown = -np.ones(len(self.slots), int)
+        # value last written to each entry
+        self.displayed = np.nan*np.ones(len(self.slots))
+        self.background = self.slots[0][1].cget('bg') if self.slots else ''
+        self.editable = 1
+        self.setEditable(editable)
+
+        self.sb = Scrollbar(self, orient=HORIZONTAL, command=self.xview)
+        self.sb.grid(column=0, row=nrows + 1, columnspan=2*self.ncols,
+                     sticky=E+W)
+        self.refresh()
+
+    def setValues(self, values):
+        """Display a new array of values for all species."""
+        self.values = np.array(values, float)
+        if self.hidezero or self.ranked:
+            self.filter()
+        self.refresh()
+
+    def get(self):
+        """Return the values of all species, including edits."""
+        self.store()
+        return self.values
+
+    def setHide(self, hide):
+        """Show only the species with nonzero values if hide is true."""
+        self.store()
+        self.hidezero = hide
+        self.filter()
+        self.refresh()
+
+    def setRanked(self, ranked):
+        """List the species by decreasing magnitude if ranked is true."""
+        self.store()
+        self.ranked = ranked
+        self.filter()
+        self.refresh()
+
+    def setEditable(self, editable):
+        if editable == self.editable:
+            return
+        self.store()
+        self.editable = editable
+        for l, e, v, col, row in self.slots:
+            if editable:
+                e.config(state=NORMAL, bg=self.background)
+            else:
+                e.config(state=DISABLED, bg='lightgray')
+
+    def filter(self):
+        if self.hidezero:
+            self.rows = np.nonzero(self.values)[0]
+        else:
+            self.rows = np.arange(self.nsp)
+        if self.ranked:
+            self.rows = self.rows[ranking.top(abs(self.values[self.rows]))]
+        self.scrollTo(self.first // self.nrows)
+
+    def store(self):
+        """Copy the contents of the visible entries into values."""
+        if not self.editable:
+            return
+        for n, (l, e, v, col, row) in enumerate(self.slots):
+            k = self.shown[n]
+            if k < 0:
+                continue
+            try:
+                self.values[k] = self.displayed[n] = v.get()
+            except (TclError, ValueError):
+                pass
+
+    def refresh(self):
+        """Bind the widgets to the visible species and show their values.
+
+        Only cells whose species or displayed value changed are pushed to
+        Tk, so refreshing with mostly unchanged values is cheap.
+        """
+        nrows = len(self.rows)
+        idx = self.rows[self.first:self.first + len(self.slots)]
+        n = len(idx)
+        vals = self.values[idx]
+        vals = np.where(abs(vals) > _CUTOFF, vals, 0.0)
+        moved = self.shown[:n] != idx
+        changed = moved | (self.displayed[:n] != vals)
+        for i in np.nonzero(changed)[0]:
+            l, e, v, col, row = self.slots[i]
+            if moved[i]:
+                if self.shown[i] < 0:
+                    l.grid(column=col, row=row, sticky=E)
+                    e.grid(column=col+1, row=row)
+                l.spindex = int(idx[i])
+                l.config(text=self.names[idx[i]])
+                self.shown[i] = idx[i]
+            v.set(vals[i])
+        self.displayed[:n] = vals
+
+        for i in np.nonzero(self.shown[n:] >= 0)[0] + n:
+            l, e, v, col, row = self.slots[i]
+            l.grid_remove()
+            e.grid_remove()
+            self.shown[i] = -1
+            self.displayed[i] = np.nan
+
+        for c, (l, e) in enumerate(self.headers):
+            if self.first + c*self.nrows < nrows:
+                l.grid(column=2*c, row=0, sticky=E+W)
+                e.grid(column=2*c+1, row=0, sticky=E+W)
+            else:
+                l.grid_remove()
+                e.grid_remove()
+
+        ncols = max(1, -(-nrows // self.nrows))
+        c0 = self.first // self.nrows
+        self.sb.set(float(c0)/ncols, float(c0 + self.ncols)/ncols)
+
+    def scrollTo(self, col):
+        ncols = -(-len(self.rows) // self.nrows)
+        col = max(0, min(col, ncols - self.ncols))
+        self.first = col*self.nrows
+
+    def xview(self, *args):
+        ncols = -(-len(self.rows) // self.nrows)
+        col = self.first // self.nrows
+        if args[0] == 'moveto':
+            col = int(round(float(args[1])*ncols))
+        elif args[0] == 'scroll':
+            step = int(args[1])
+            if args[2] == 'pages':
+                step *= self.ncols
+            col += step
+        self.store()
+        self.scrollTo(col)
+        self.refresh()
+
+    def wheel(self, event):
+        if event.num == 4 or getattr(event, 'delta', 0) > 0:
+            self.xview('scroll', -1, 'units')
+        else:
+            self.xview('scroll', 1, 'units')
@@ -8,18 +8,23 @@ else:
     from Tkinter import *
 
 import re, math
+import numpy as np
 from cantera import *
 from .Units import temperature, specificEnergy, specificEntropy
 from .UnitChooser import UnitVar
 from .GraphFrame import Graph
+from .thermocache import thermoCache
 
 def testit():
     pass
 
 class SpeciesInfo(Label):
-    def __init__(self,master,phase=None,species=None,**opt):
+    def __init__(self,master,phase=None,species=None,spindex=None,**opt):
         Label.__init__(self,master,opt)
-        self.sp = species
+        # if spindex is given, species is a sequence that is only indexed
+        # when the popup is first shown
+        self.species = species
+        self.spindex = spindex
         self.phase = phase
         self.bind('<Double-1>', self.show)
         self.bind('<Button-3>', self.show)
@@ -27,6 +32,12 @@ class SpeciesInfo(Label):
         self.bind('<Any-Leave>', self.nohighlight)
 
 
+    @property
+    def sp(self):
+        if self.spindex is None:
+            return self.species
+        return self.species[self.spindex]
+
     def highlight(self, event=None):
         self.config(fg='yellow')
 
@@ -80,9 +91,7 @@ class SpeciesInfo(Label):
 
         tmin = self.sp.minTemp
         tmax = self.sp.maxTemp
-        cp = self.sp.cp_R(tmin)
-        hh = self.sp.enthalpy_RT(tmin)
-        ss = self.sp.entropy_R(tmin)
+        cp, hh, ss = self.sp.thermo(tmin)
 
         self.prop[0].bind("<Any-Enter>", self.decouple)
         self.prop[0].bind("<Any-Leave>", self.update)
@@ -94,16 +103,13 @@ class SpeciesInfo(Label):
         self.graphs.config(relief=GROOVE,bd=4)
         self.graphs.grid(row=2,column=0,columnspan=10,sticky=E+W)
 
-        self.cpdata = []
-        self.hdata = []
-        self.sdata = []
-        t = tmin
         n = int((tmax - tmin)/100.0)
-        while t <= tmax:
-            self.cpdata.append((t,self.sp.cp_R(t)))
-            self.hdata.append((t,self.sp.enthalpy_RT(t)))
-            self.sdata.append((t,self.sp.entropy_R(t)))
-            t += n
+        tt = tmin + n*np.arange(int((tmax - tmin)/n) + 1)
+        cpt, ht, st = thermoCache.curves(self.sp.mechkey, self.sp.g,
+                                         self.sp.index, tt)
+        self.cpdata = list(zip(tt, cpt))
+        self.hdata = list(zip(tt, ht))
+        self.sdata = list(zip(tt, st))
 
         # specific heat
 
@@ -176,13 +182,11 @@ class SpeciesInfo(Label):
     def update(self,event=None):
         try:
             tmp = self.prop[0].get()
-            cnd = self.sp.cp_R(tmp)
+            cnd, hnd, snd = self.sp.thermo(tmp)
             cc = cnd*gas_constant
             self.prop[1].set(cc)
-            hnd = self.sp.enthalpy_RT(tmp)
             hh = hnd*tmp*gas_constant
             self.prop[2].set(hh)
-            snd = self.sp.entropy_R(tmp)
             ss = snd*tmp*gas_constant
             self.prop[3].set(ss)
 
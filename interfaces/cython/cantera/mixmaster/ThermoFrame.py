@@ -13,7 +13,10 @@ from .Units import temperature, pressure, density, specificEnergy, specificEntro
 from .UnitChooser import UnitVar
 from .ThermoProp import ThermoProp
 from .utilities import handleError
+from .Mix import properties, findPair
+from .scheduler import STATE, COMPOSITION
 
+# indices of the property entries, in the order of Mix.properties
 _PRESSURE = 1
 _TEMPERATURE = 0
 _DENSITY = 2
@@ -106,44 +109,25 @@ class ThermoFrame(Frame):
             self.warn = 0
         else:
             self.warn = 1
-        self.top.mixfr.update()
+        if self.top.mixfr:
+            self.top.mixfr.update()
         i = self.equil.get()
         optlist = ['frozen','equilibrium']
         opt = [optlist[i]]
 
-        if self.prop[_PRESSURE].isChecked() \
-           and self.prop[_TEMPERATURE].isChecked():
-            self.mix.set(
-                    temperature = self.prop[_TEMPERATURE].get(),
-                    pressure = self.prop[_PRESSURE].get(),
-                    equil=i)
-
-        elif self.prop[_DENSITY].isChecked() \
-             and self.prop[_TEMPERATURE].isChecked():
-            self.mix.set(
-                    temperature = self.prop[_TEMPERATURE].get(),
-                    density = self.prop[_DENSITY].get(),
-                    equil=i)
-
-        elif self.prop[_ENTROPY].isChecked() \
-             and self.prop[_PRESSURE].isChecked():
-            self.mix.set(pressure = self.prop[_PRESSURE].get(),
-                         entropy = self.prop[_ENTROPY].get(),
-                         equil=i)
-
-        elif self.prop[_ENTHALPY].isChecked() \
-             and self.prop[_PRESSURE].isChecked():
-            self.mix.set(pressure = self.prop[_PRESSURE].get(),
-                         enthalpy = self.prop[_ENTHALPY].get(),
-                         equil=i)
-
-        elif self.prop[_INTENERGY].isChecked() \
-             and self.prop[_DENSITY].isChecked():
-            self.mix.set(density = self.prop[_DENSITY].get(),
-                         intEnergy = self.prop[_INTENERGY].get(),
-                         equil=i)
+        checked = [properties[n] for n in range(len(self.prop))
+                   if self.prop[n].isChecked()]
+        pair = findPair(checked)
+        if pair:
+            values = {}
+            for p in pair:
+                values[p] = self.prop[properties.index(p)].get()
+            self.mix.set(equil=i, **values)
         else:
             if self.warn > 0:
                 handleError("unsupported property pair")
 
-        self.top.update()
+        if i:
+            self.top.update(STATE, COMPOSITION)
+        else:
+            self.top.update(STATE)
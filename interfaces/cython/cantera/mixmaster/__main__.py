@@ -1,8 +1,40 @@
-from cantera.mixmaster.main import MixMaster
+import sys
+import argparse
 
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m cantera.mixmaster')
+    parser.add_argument('--batch', metavar='JOBFILE',
+                        help='run the states in a JSON job file without '
+                        'starting the graphical interface')
+    parser.add_argument('-o', '--output', metavar='FILE',
+                        help='batch output file (.csv or .npz; - for '
+                        'stdout)')
+    parser.add_argument('-j', '--processes', type=int, default=1,
+                        help='number of worker processes for batch mode')
+    parser.add_argument('--clear-cache', action='store_true',
+                        help='clear the mechanism cache and exit')
+    parser.add_argument('--import-time', action='store_true',
+                        help='report module import times and exit')
+    args = parser.parse_args(argv)
 
-def main():
+    if args.import_time:
+        from cantera.mixmaster import importtime
+        importtime.report()
+        return 0
+
+    if args.clear_cache:
+        from cantera.mixmaster import mechcache
+        print('removed %d cached mechanisms' % mechcache.clear())
+        return 0
+
+    # batch mode must not import tkinter, so the GUI is imported only here
+    if args.batch:
+        from cantera.mixmaster.batch import run
+        return 1 if run(args.batch, args.output, args.processes) else 0
+
+    from cantera.mixmaster.main import MixMaster
     MixMaster()
+    return 0
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
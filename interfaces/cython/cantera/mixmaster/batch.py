@@ -0,0 +1,176 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Headless batch calculations. Nothing in this module (or the modules it
+# imports) may import tkinter.
+#
+# A job file is a JSON object naming the mechanism and listing states:
+#
+#   {"mechanism": "gri30.cti",
+#    "X": "CH4:1, O2:2, N2:7.52",
+#    "states": [{"temperature": 300.0, "pressure": 101325.0},
+#               {"enthalpy": 0.0, "pressure": 101325.0, "equilibrate": 1},
+#               {"Y": "H2:1, O2:8", "temperature": 1500.0,
+#                "density": 0.2}]}
+#
+# Each state gives a composition ("X" mole fractions or "Y" mass
+# fractions, as a composition string or a species: value object; a value
+# at the top level is the default for all states) and two of the
+# properties accepted by Mix.set. Results are written one row per state.
+
+from __future__ import print_function
+
+import sys
+import json
+import multiprocessing
+import numpy as np
+
+from .Mix import Mix, properties, findPair
+from . import mechcache
+
+_SCALARS = ('T', 'P', 'density', 'u', 'h', 's', 'cp', 'mw')
+
+# per-process state for pool workers
+_worker = {}
+
+def columns(g):
+    """Names of the output columns for mechanism g."""
+    return (['state', 'ok'] + list(_SCALARS)
+            + ['X_' + nm for nm in g.species_names]
+            + ['wdot_' + nm for nm in g.species_names])
+
+def evaluate(mix, state):
+    """Set the mixture to one job state and return its result row."""
+    g = mix.g
+    if 'Y' in state:
+        g.Y = state['Y']
+        mix.setMass(g.Y)
+    elif 'X' in state:
+        g.X = state['X']
+        mix.setMoles(g.X)
+    else:
+        raise ValueError('no composition given')
+
+    pair = findPair(state)
+    if pair is None:
+        raise ValueError('unsupported property pair: '
+                         + ', '.join(p for p in properties if p in state))
+    values = {}
+    for p in pair:
+        values[p] = float(state[p])
+    if mix.set(equil=int(state.get('equilibrate', 0)), **values) is None:
+        raise ValueError('state not set from ' + ', '.join(pair))
+
+    return np.concatenate((
+        [g.T, g.P, g.density, g.int_energy_mass, g.enthalpy_mass,
+         g.entropy_mass, g.cp_mass, g.mean_molecular_weight],
+        g.X, g.net_production_rates))
+
+def _init(mech):
+    g, key = mechcache.load(mech)
+    _worker['mix'] = Mix(g, key)
+
+def _run(job):
+    n, state = job
+    mix = _worker['mix']
+    try:
+        row = evaluate(mix, state)
+        ok = 1
+    except Exception as e:
+        print('state %d: %s' % (n, e), file=sys.stderr)
+        row = np.nan*np.ones(len(_SCALARS) + 2*mix.nsp)
+        ok = 0
+    return np.concatenate(([n, ok], row))
+
+def readJobs(fname):
+    """Read a job file. Returns the mechanism and the list of states."""
+    with open(fname) as f:
+        job = json.load(f)
+    defaults = {}
+    for k in ('X', 'Y', 'equilibrate'):
+        if k in job:
+            defaults[k] = job[k]
+    states = []
+    for s in job['states']:
+        state = dict(defaults)
+        if 'X' in s or 'Y' in s:
+            state.pop('X', None)
+            state.pop('Y', None)
+        state.update(s)
+        states.append(state)
+    return job['mechanism'], states
+
+class _CSVWriter:
+    def __init__(self, f, names):
+        self.f = f
+        self.f.write(','.join(names) + '\n')
+
+    def write(self, row):
+        self.f.write('%d,%d,' % (row[0], row[1]))
+        self.f.write(','.join(repr(float(v)) for v in row[2:]) + '\n')
+
+    def close(self):
+        self.f.flush()
+
+class _NPZWriter:
+    def __init__(self, fname, names):
+        self.fname = fname
+        self.names = names
+        self.rows = []
+
+    def write(self, row):
+        self.rows.append(row)
+
+    def close(self):
+        data = np.array(self.rows).reshape(-1, len(self.names))
+        out = {}
+        for n, name in enumerate(self.names):
+            out[name] = data[:,n]
+        np.savez(self.fname, **out)
+
+def run(jobfile, output=None, processes=1):
+    """Evaluate all states in a job file and write the results.
+
+    Rows are streamed to a CSV file as they are computed (``output`` '-'
+    writes to stdout); if ``output`` ends in '.npz' the columns are saved
+    as arrays of a NumPy archive instead. With ``processes`` > 1 the
+    states are evaluated on a pool of worker processes. Returns the
+    number of states that failed.
+    """
+    mech, states = readJobs(jobfile)
+    if output is None:
+        output = jobfile.rsplit('.', 1)[0] + '.csv'
+
+    _init(mech)
+    names = columns(_worker['mix'].g)
+    if output.endswith('.npz'):
+        f = None
+        writer = _NPZWriter(output, names)
+    elif output == '-':
+        f = None
+        writer = _CSVWriter(sys.stdout, names)
+    else:
+        f = open(output, 'w')
+        writer = _CSVWriter(f, names)
+
+    jobs = list(enumerate(states))
+    nfail = 0
+    pool = None
+    try:
+        if processes > 1:
+            pool = multiprocessing.Pool(processes, _init, (mech,))
+            chunk = max(1, len(jobs) // (8*processes))
+            rows = pool.imap(_run, jobs, chunk)
+        else:
+            rows = (_run(job) for job in jobs)
+        for row in rows:
+            nfail += row[1] == 0
+            writer.write(row)
+        writer.close()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+        if f:
+            f.close()
+    return int(nfail)
@@ -0,0 +1,443 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Readers for the solution files shown in the data window.
+
+import os
+import re
+import sys
+import json
+import mmap
+import struct
+import tempfile
+import warnings
+import numpy as np
+
+from .lru import LRUCache
+from .fileutils import replaceFile
+
+# rows of a dataset; row 0 is the independent variable, and the mass
+# fraction of species k is in row Y_LOC + k
+U_LOC = 1
+V_LOC = 2
+T_LOC = 3
+P_LOC = 4
+Y_LOC = 5
+
+# number of CSV lines parsed at a time
+_CHUNK = 50000
+
+# A binary dataset (.mxd file) is the 8-byte magic string below, the
+# length of a JSON header as a little-endian uint64, the header (padded
+# with spaces so that the data starts on a 64-byte boundary), and then one
+# contiguous array of npts little-endian doubles per column, in header
+# order. The header is
+#
+#   {"npts": 1000,
+#    "columns": [{"label": "z", "row": 0}, {"label": "T", "row": 3},
+#                {"label": "H2", "species": "H2"}, ...]}
+#
+# Species columns are identified by name, so a file can be opened with any
+# mechanism; species the mechanism does not have are skipped.
+_MAGIC = b'MXDATA01'
+BINARY = '.mxd'
+
+class Cancelled(Exception):
+    """Raised by a reader when its cancel function returns true."""
+    pass
+
+def countLines(fname, blocksize=1<<20):
+    """Number of lines in a file, counted without decoding it."""
+    n = 0
+    last = b'\n'
+    with open(fname, 'rb') as f:
+        while True:
+            block = f.read(blocksize)
+            if not block:
+                break
+            n += block.count(b'\n')
+            last = block[-1:]
+    if last != b'\n':
+        n += 1
+    return n
+
+def csvColumns(fname, g):
+    """Map the columns named in the header of a CSV file to dataset rows.
+
+    Returns a list of (column, row, label) for the columns that are used:
+    the first column, 'T', 'P', 'u', 'V', and species of g.
+    """
+    with open(fname, 'r') as f:
+        vars = f.readline().split(',')
+    nv = len(vars)
+    vv = []
+    for n in range(nv):
+        nm = vars[n].split()
+        if n < nv - 1 or (len(nm) > 0 and nm[0].isalnum()):
+            vv.append(nm[0])
+        else:
+            break
+    nv = len(vv)
+    vars = vv
+
+    cols = [(0, 0, vars[0])]
+    locs = {'T':T_LOC, 'P':P_LOC, 'u':U_LOC, 'V':V_LOC}
+    for n in range(1, nv-1):
+        v2 = vars[n]
+        if v2 in locs:
+            cols.append((n, locs[v2], v2))
+            continue
+        try:
+            k = g.species_index(v2)
+        except:
+            k = -1
+        if k >= 0:
+            cols.append((n, k + Y_LOC, v2))
+    return cols
+
+def readCSV(fname, cols, nsp, progress=None, cancel=None, chunk=_CHUNK):
+    """Read the columns cols (from csvColumns) of a CSV solution file.
+
+    The file is parsed ``chunk`` lines at a time by numpy's C parser, and
+    each chunk is copied straight into preallocated storage for just the
+    columns in cols. After each chunk ``progress`` is called with the
+    fraction read, and Cancelled is raised if ``cancel`` returns true.
+    Returns a ColumnStore with nsp+6 rows and the list of row labels.
+    """
+    npts = countLines(fname) - 1
+    values = np.zeros((len(cols), max(npts, 0)), 'd')
+    label = ['-']*(nsp+6)
+    usecols = [c[0] for c in cols]
+    for c, loc, nm in cols:
+        label[loc] = nm
+
+    n = 0
+    with open(fname, 'r') as f:
+        f.readline()
+        while n < npts:
+            if cancel and cancel():
+                raise Cancelled()
+            with warnings.catch_warnings():
+                # an empty chunk only means blank lines at the end
+                warnings.simplefilter('ignore')
+                block = np.loadtxt(f, dtype=float, delimiter=',',
+                                   usecols=usecols, ndmin=2,
+                                   max_rows=min(chunk, npts - n))
+            if not len(block):
+                break
+            values[:, n:n+len(block)] = block.T
+            n += len(block)
+            if progress:
+                progress(float(n)/npts)
+
+    store = ColumnStore(nsp+6, n)
+    for c, (col, loc, nm) in enumerate(cols):
+        store.columns[loc] = values[c,:n]
+    return store, label
+
+
+class ColumnStore:
+    """A dataset indexed like an (nrows, npts) array, holding only the
+    rows present; other rows read as zero. ``loaders`` maps rows to
+    functions that read them on first use."""
+    def __init__(self, nrows, npts):
+        self.shape = (nrows, npts)
+        self.columns = {}
+        self.loaders = {}
+        self._zeros = None
+
+    def row(self, i):
+        col = self.columns.get(i)
+        if col is None and i in self.loaders:
+            col = self.columns[i] = self.loaders.pop(i)()
+        if col is None:
+            if self._zeros is None:
+                self._zeros = np.zeros(self.shape[1])
+                self._zeros.flags.writeable = False
+            return self._zeros
+        return col
+
+    @property
+    def nbytes(self):
+        """Memory held by the columns read so far; memory maps and
+        columns not yet decoded are not counted."""
+        return sum(col.nbytes for col in self.columns.values()
+                   if not isinstance(col, np.memmap))
+
+    def __getitem__(self, index):
+        if not isinstance(index, tuple):
+            index = (index, slice(None))
+        i, j = index
+        if isinstance(i, slice):
+            return np.array([self.row(r)[j]
+                             for r in range(*i.indices(self.shape[0]))])
+        return self.row(i)[j]
+
+    def massFractions(self, n):
+        """The full mass fraction vector at point n, zero where missing."""
+        y = np.zeros(self.shape[0] - Y_LOC)
+        for i in list(self.columns) + list(self.loaders):
+            if i >= Y_LOC:
+                y[i - Y_LOC] = self.row(i)[n]
+        return y
+
+    def __setitem__(self, index, value):
+        if not isinstance(index, tuple):
+            index = (index, slice(None))
+        i, j = index
+        if isinstance(j, slice) and j == slice(None):
+            col = np.empty(self.shape[1])
+        else:
+            col = np.array(self.row(i))
+        col[j] = value
+        self.loaders.pop(i, None)
+        self.columns[i] = col
+
+def writeBinary(fname, data, label, names):
+    """Write the labeled rows of data to a binary dataset.
+
+    data may be a ColumnStore or an array, label is the list of row labels
+    ('-' for rows that are not present), and names are the species names
+    of the mechanism. The file is written to a temporary name first and
+    then renamed.
+    """
+    rows = [i for i in range(len(label)) if label[i] != '-']
+    columns = []
+    for i in rows:
+        if i >= Y_LOC:
+            columns.append({'label': label[i], 'species': names[i-Y_LOC]})
+        else:
+            columns.append({'label': label[i], 'row': i})
+    npts = data.shape[1]
+    header = json.dumps({'npts': npts, 'columns': columns}).encode()
+    header += b' '*((-16 - len(header)) % 64)
+
+    fd, tmp = tempfile.mkstemp(suffix=BINARY,
+                               dir=os.path.dirname(os.path.abspath(fname)))
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for i in rows:
+                np.asarray(data[i,:], '<f8').tofile(f)
+        replaceFile(tmp, fname)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def openBinary(fname, g):
+    """Open a binary dataset for the species of g.
+
+    The columns are memory-mapped, so nothing is read until they are
+    used. Returns a ColumnStore, the row labels, and a list of
+    (label, row) for the columns present.
+    """
+    with open(fname, 'rb') as f:
+        if f.read(8) != _MAGIC:
+            raise ValueError(fname + ' is not a MixMaster dataset')
+        hlen = struct.unpack('<Q', f.read(8))[0]
+        header = json.loads(f.read(hlen).decode())
+    npts = header['npts']
+    columns = header['columns']
+    if npts and columns:
+        mm = np.memmap(fname, dtype='<f8', mode='r', offset=16 + hlen,
+                       shape=(len(columns), npts))
+    else:
+        mm = np.zeros((len(columns), npts))
+
+    nsp = g.n_species
+    store = ColumnStore(nsp+6, npts)
+    label = ['-']*(nsp+6)
+    cols = []
+    for c, col in enumerate(columns):
+        if 'species' in col:
+            try:
+                row = g.species_index(col['species']) + Y_LOC
+            except:
+                continue
+        else:
+            row = col['row']
+        store.columns[row] = mm[c]
+        label[row] = col['label']
+        cols.append((col['label'], row))
+    return store, label, cols
+
+_SIMULATION = re.compile(br'<simulation[\s>/]')
+_ID = re.compile(br'\bid\s*=\s*["\']([^"\']*)["\']')
+
+def _decode(fname, start, end):
+    """The numbers in bytes start to end of fname, as an array."""
+    with open(fname, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start)
+    return np.array(text.replace(b',', b' ').split(), float)
+
+class XMLIndex:
+    """Simulation ids and floatArray positions in an XML solution file.
+
+    A simulation is parsed only when it is read, and its arrays only
+    when they are used."""
+    def __init__(self, fname):
+        self.fname = fname
+        self.ids = []
+        self.ranges = {}
+        self.entries = {}
+        with open(fname, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                self._scan(buf)
+            finally:
+                buf.close()
+
+    def _scan(self, buf):
+        pos = 0
+        while True:
+            m = _SIMULATION.search(buf, pos)
+            if m is None:
+                break
+            start = m.start()
+            stag = buf.find(b'>', start)
+            end = buf.find(b'</simulation>', stag)
+            if stag < 0 or end < 0:
+                break
+            end += len(b'</simulation>')
+            tag = buf[start:stag]
+            sid = _ID.search(tag)
+            sid = sid.group(1).decode() if sid else str(len(self.ids))
+            self.ids.append(sid)
+            self.ranges[sid] = (start, end)
+            pos = end
+
+    def arrays(self, sid):
+        """Return the pressure and a list of (title, size, start, end) for
+        the floatArrays of simulation sid; start and end are the file
+        offsets of the text of the array."""
+        if sid in self.entries:
+            return self.entries[sid]
+        from xml.parsers import expat
+        start, end = self.ranges[sid]
+        with open(self.fname, 'rb') as f:
+            f.seek(start)
+            buf = f.read(end - start)
+
+        arrays = []
+        pressure = [0.0]
+        current = {}
+        p = expat.ParserCreate()
+        text = []
+
+        def begin(name, attrs):
+            if name == 'grid_data':
+                current['grid'] = True
+            elif name == 'floatArray' and 'grid' in current:
+                current['array'] = (attrs.get('title'), attrs.get('size'),
+                                  p.CurrentByteIndex)
+            elif name == 'float' and attrs.get('title') == 'pressure':
+                del text[:]
+                p.CharacterDataHandler = text.append
+
+        def finish(name):
+            if name == 'grid_data':
+                current.pop('grid', None)
+            elif name == 'floatArray' and 'array' in current:
+                title, size, tag = current.pop('array')
+                i = p.CurrentByteIndex
+                # a self-closing element has no end tag to skip
+                if buf[i:i+2] == b'</':
+                    j = buf.find(b'>', tag) + 1
+                else:
+                    j = i
+                arrays.append((title, int(size) if size else None,
+                               start + j, start + i))
+            elif name == 'float' and p.CharacterDataHandler:
+                p.CharacterDataHandler = None
+                try:
+                    pressure[0] = float(''.join(text))
+                except ValueError:
+                    pass
+
+        p.StartElementHandler = begin
+        p.EndElementHandler = finish
+        p.Parse(buf, True)
+        self.entries[sid] = (pressure[0], arrays)
+        return self.entries[sid]
+
+    def read(self, sid, g):
+        """Simulation sid for the species of g.
+
+        Returns a ColumnStore whose columns are read on first use, the row
+        labels, and a list of (label, row) for the columns present.
+        """
+        p, arrays = self.arrays(sid)
+        nsp = g.n_species
+        label = ['-']*(nsp+6)
+        cols = []
+        npts = arrays[0][1] if arrays else 0
+        data = ColumnStore(nsp+6, npts or 0)
+        locs = {'z':0, 't':0, 'T':T_LOC, 'u':U_LOC, 'V':V_LOC}
+        for title, size, start, end in arrays:
+            try:
+                row = g.species_index(title) + Y_LOC
+            except:
+                row = locs.get(title)
+            if row is None:
+                continue
+            data.loaders[row] = (lambda start=start, end=end:
+                                 _decode(self.fname, start, end))
+            label[row] = title
+            if row > 0:
+                cols.append((title, row))
+        data[P_LOC,:] = p
+        label[P_LOC] = 'P (Pa)'
+        return data, label, cols
+
+# indexes of recently opened XML files, by path, size and time modified
+_indexes = LRUCache(maxitems=16)
+
+def xmlIndex(fname):
+    """The XMLIndex of fname, reused until the file changes."""
+    st = os.stat(fname)
+    key = (os.path.abspath(fname), st.st_size, st.st_mtime)
+    index = _indexes.get(key)
+    if index is None:
+        index = XMLIndex(fname)
+        _indexes.put(key, index)
+    return index
+
+def readXML(fname, g, simulation=None):
+    """Read a simulation from a Cantera XML solution file.
+
+    Returns a ColumnStore, the row labels, and the id of the simulation
+    read, which is the last one if simulation is None.
+    """
+    index = xmlIndex(fname)
+    if not index.ids:
+        raise ValueError(fname + ' contains no simulations')
+    if simulation is None:
+        simulation = index.ids[-1]
+    data, label, cols = index.read(simulation, g)
+    return data, label, simulation
+
+def convert(src, dest, g, simulation=None):
+    """Convert a CSV or XML solution file to a binary dataset."""
+    ext = os.path.splitext(src)[1].lower()
+    if ext == '.csv':
+        cols = csvColumns(src, g)
+        data, label = readCSV(src, cols, g.n_species)
+    elif ext in ('.xml', '.ctml'):
+        data, label, sim = readXML(src, g, simulation)
+    else:
+        raise ValueError('cannot convert ' + src)
+    writeBinary(dest, data, label, g.species_names)
+
+if __name__ == '__main__':
+    if len(sys.argv) < 4:
+        print('usage: python -m cantera.mixmaster.dataset '
+              'SOURCE DEST MECHANISM [SIMULATION]')
+        sys.exit(1)
+    from cantera import Solution
+    convert(sys.argv[1], sys.argv[2], Solution(sys.argv[3]),
+            *sys.argv[4:5])
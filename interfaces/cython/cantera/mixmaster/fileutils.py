@@ -0,0 +1,17 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# File helpers shared by the caches and data readers. This module must not
+# import tkinter.
+
+import os
+import sys
+
+def replaceFile(src, dest):
+    """Rename src to dest, replacing dest if it exists."""
+    if sys.version_info[0] == 3:
+        os.replace(src, dest)
+    else:
+        if os.path.exists(dest):
+            os.remove(dest)
+        os.rename(src, dest)
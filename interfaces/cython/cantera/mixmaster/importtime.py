@@ -0,0 +1,64 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Import-time report for MixMaster, based on 'python -X importtime'
+# (Python 3.7 or later). Each module is imported in a fresh interpreter so
+# that nothing is already cached in sys.modules.
+
+from __future__ import print_function
+
+import sys
+import subprocess
+
+# modules timed by default: the GUI start-up path, the headless path, and
+# the heavy dependencies that the GUI defers
+_MODULES = ['cantera.mixmaster.main', 'cantera.mixmaster.batch',
+            'tkinter', 'numpy', 'cantera']
+
+def measure(module):
+    """Import module in a new interpreter and return its import times.
+
+    Returns a list of (cumulative, self, name) tuples in microseconds, one
+    per module imported, in the order they completed.
+    """
+    p = subprocess.Popen([sys.executable, '-X', 'importtime', '-c',
+                          'import ' + module],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                         universal_newlines=True)
+    out, err = p.communicate()
+    if p.returncode != 0:
+        raise RuntimeError('could not import %s:\n%s' % (module, err))
+    times = []
+    for line in err.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            t_self, t_cum = int(fields[0]), int(fields[1])
+        except ValueError:
+            # the header line
+            continue
+        times.append((t_cum, t_self, fields[2].strip()))
+    return times
+
+def report(modules=None, top=10, out=sys.stdout):
+    """Print the total import time of each module and its slowest imports."""
+    if sys.version_info < (3, 7):
+        print('import-time report requires Python 3.7 or later', file=out)
+        return
+    for module in modules or _MODULES:
+        try:
+            times = measure(module)
+        except RuntimeError as e:
+            print(e, file=out)
+            continue
+        total = [t for t in times if t[2] == module]
+        total = total[-1][0] if total else sum(t[1] for t in times)
+        print('%-30s %10.1f ms  (%d modules)'
+              % (module, total*1.0e-3, len(times)), file=out)
+        for t_cum, t_self, name in sorted(times, reverse=True)[1:top+1]:
+            print('    %-40s %10.1f ms cumulative %10.1f ms self'
+                  % (name, t_cum*1.0e-3, t_self*1.0e-3), file=out)
+
+if __name__ == '__main__':
+    report(sys.argv[1:])
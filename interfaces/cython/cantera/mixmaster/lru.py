@@ -0,0 +1,84 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+from collections import OrderedDict
+import threading
+
+def sizeof(value):
+    """Approximate memory footprint of a cached value in bytes."""
+    if hasattr(value, 'nbytes'):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(sizeof(v) for v in value)
+    if isinstance(value, dict):
+        return sum(sizeof(v) for v in value.values())
+    return 64
+
+class LRUCache:
+    """A least-recently-used cache bounded by item count and/or memory.
+
+    Entries are evicted oldest-first once either ``maxitems`` entries are
+    held or the summed size of the values exceeds ``maxbytes``. Either
+    limit may be None. If ``onevict`` is given it is called with the key
+    and value of every entry that is dropped to make room.
+    """
+    def __init__(self, maxitems=None, maxbytes=None, onevict=None):
+        self.maxitems = maxitems
+        self.maxbytes = maxbytes
+        self.onevict = onevict
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def keys(self):
+        return list(self._data.keys())
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, size = self._data.pop(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data[key] = (value, size)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self.pop(key)
+            size = sizeof(value)
+            self._data[key] = (value, size)
+            self.nbytes += size
+            self._shrink()
+
+    def pop(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, size = self._data.pop(key)
+            self.nbytes -= size
+            return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def _shrink(self):
+        # the newest entry is always kept, even if it alone exceeds the budget
+        while len(self._data) > 1 and (
+                (self.maxitems is not None and len(self._data) > self.maxitems)
+                or (self.maxbytes is not None and self.nbytes > self.maxbytes)):
+            key, (value, size) = self._data.popitem(last=False)
+            self.nbytes -= size
+            if self.onevict:
+                self.onevict(key, value)
@@ -25,24 +25,21 @@ else:
 
 import sys, os, string
 
-# Cantera imports
-from cantera import *
-from numpy import zeros
+# Only the modules needed to draw the control window are imported here.
+# Cantera, NumPy and the frame modules are imported when a mechanism is
+# first loaded or a window is first opened.
 from . import utilities
-
-# local imports
-from .TransportFrame import TransportFrame
-from .CompositionFrame import MixtureFrame
-from .ThermoFrame import ThermoFrame
-from .ImportFrame import ImportFrame
-from .DataFrame import DataFrame
-from .KineticsFrame import SpeciesKineticsFrame, ReactionKineticsFrame, ReactionPathFrame
-#from Edit import EditFrame
 from .MechManager import MechManager, _autoload
-from .UnitChooser import UnitVar
 from .ControlPanel import ControlWindow
 from .ControlPanel import make_menu, menuitem_state
-from .Mix import Mix, Species
+from .scheduler import UpdateScheduler, COMPOSITION, STATE, RATES
+
+# mixture facets shown by each top-level window
+_subscriptions = {'rxndata': (RATES,),
+                  'rxnpaths': (RATES,)}
+
+# top-level windows that show the current mixture
+_mixwindows = ('rxndata', 'rxnpaths', 'dataset')
 
 def testit():
     return
@@ -58,33 +55,45 @@ class MixMaster:
                                               ("XML Files", "*.xml *.ctml"),
                                               ("All Files", "*.*")])
         if pathname:
-            self.loadmech('', pathname)
+            self.mechframe.addMechanism('', pathname)
 
 
     def loadmech(self, mechname, pathname, mw=1):
-
-        p = os.path.normpath(os.path.dirname(pathname))
-        self.fname = os.path.basename(pathname)
-        ff = os.path.splitext(self.fname)
-
+        from . import mechcache
+        from .thermocache import mechanismKey
         try:
-            self.mech = Solution(pathname)
-            self.mechname = ff[0]
-
+            mech, key = mechcache.load(pathname)
+            if key is None:
+                key = mechanismKey(pathname, mech)
         except Exception as e:
-            utilities.handleError('could not create gas mixture object: '
-                                  +ff[0]+'\n'+str(e))
-            self.mechname = 'Error'
+            self.loadError(pathname, e)
             return
+        self.mechframe.addMechanism(mechname, pathname, mw, mech, key)
+
+
+    def loadError(self, pathname, err):
+        ff = os.path.splitext(os.path.basename(pathname))
+        utilities.handleError('could not create gas mixture object: '
+                              +ff[0]+'\n'+str(err))
+        self.mechname = 'Error'
 
-        self.makeMix()
 
-        if not mechname:
-            mechname = self.mechname
+    def setmech(self, mech, key, pathname, state=None):
+        """Make mech the current mechanism and rebuild the windows.
 
-        self.mechframe.addMechanism(mechname, self.mech)
-        if mw==1:
-            self.makeWindows()
+        If state is given it is a (moles, T, P) snapshot to restore.
+        """
+        self.fname = os.path.basename(pathname)
+        self.mech = mech
+        self.mechname = os.path.splitext(self.fname)[0]
+        self.mechkey = key
+        self.pathname = pathname
+        self.makeMix()
+        if state:
+            moles, t, p = state
+            self.mix.setMoles(moles)
+            self.mix.set(temperature = t, pressure = p)
+        self.makeWindows()
 
 
     def addWindow(self, name, w):
@@ -98,8 +107,13 @@ class MixMaster:
                 pass
         else:
             wstate = 'withdrawn'
+        if name in self._windows:
+            self.scheduler.unsubscribe(self._windows[name])
         self._windows[name] = w
         self._vis[name] = IntVar()
+        if name in _subscriptions:
+            self.scheduler.subscribe(w, _subscriptions[name], w.show,
+                                     lambda: w.master.state() != 'withdrawn')
         if wstate == 'withdrawn':
             self._windows[name].master.withdraw()
         else:
@@ -107,28 +121,20 @@ class MixMaster:
 
 
 
-    def update(self):
-        """Update all windows to reflect the current mixture state."""
-        for w in self._windows.keys():
-            try:
-                m = self._windows[w].master
-                if m.state() != 'withdrawn':
-                    self._windows[w].show()
-            except:
-                pass
-        self.thermo.showState()
-        self.mixfr.show()
+    def update(self, *facets):
+        """Schedule an update of the windows showing the given facets.
 
+        With no arguments, everything that depends on the mixture is
+        refreshed. Notifications are coalesced until Tk is idle.
+        """
+        self.scheduler.notify(*facets)
 
 
-    def makeMix(self):
-        self.mix = Mix(self.mech)
-        nsp = self.mech.n_species
-        self.species = []
-        nm = self.mech.species_names
 
-        for k in range(nsp):
-            self.species.append(Species(self.mech, nm[k]))
+    def makeMix(self):
+        from .Mix import Mix, SpeciesList
+        self.mix = Mix(self.mech, self.mechkey)
+        self.species = SpeciesList(self.mech, self.mechkey)
 
         x = self.mech.X
         self.mix.setMoles(x)
@@ -166,6 +172,11 @@ class MixMaster:
         self.rxnpaths = None
         self.edit = None
         self.fname = None
+        self.mech = None
+        self.mechkey = None
+        self.pathname = None
+
+        self.scheduler = UpdateScheduler(self.cwin)
 
         self.mechframe = MechManager(self.cwin, self)
         self.mechframe.grid(row=1,column=0,sticky=N+W)
@@ -175,6 +186,8 @@ class MixMaster:
                      'separator',
                      ('Load Data File...',self.showdata),
                      'separator',
+                     ('Clear Mechanism Cache',self.clearcache),
+                     'separator',
                      ('Exit', self.stop),
                      []
                      ]
@@ -212,6 +225,10 @@ class MixMaster:
 
         self.viewmenu = make_menu('Windows', self.menubar, w)
 
+        # until the first mechanism has been loaded there is no mixture
+        # to show; MechManager enables these items when it is ready
+        self.enableMixMenus(0)
+
         self.helpmenu = make_menu('Help', self.menubar,
                                   [('About '+_app_title+'...', self.aboutmix),
                                    ('About Cantera...', testit),
@@ -219,12 +236,11 @@ class MixMaster:
 
                                    ])
 
-        # load the preloaded mechanisms
+        # list the preloaded mechanisms and, once the control window has
+        # been drawn, load the last one in the background; the windows are
+        # built when it is ready
         for m in _autoload:
-            self.loadmech(m[0],m[1],0)
-
-        self.makeWindows()
-        self.addWindow('import',ImportFrame(self))
+            self.mechframe.addMechanism(m[0], m[1], 0)
 
         self.vtherm.set(1)
         self.showthermo()
@@ -234,42 +250,88 @@ class MixMaster:
         self.master.iconify()
         self.master.update()
         self.master.deiconify()
+        self.cwin.after_idle(self.mechframe.select, len(_autoload))
         self.cwin.mainloop()
 
 
+    def enableMixMenus(self, on=1):
+        """Enable or disable the menu items that show the mixture."""
+        menuitem_state(self.filemenu, (3, on))
+        menuitem_state(self.viewmenu, (1, on), (3, on), (4, on), (5, on))
+
+
+    def clearcache(self):
+        from . import mechcache
+        report = mechcache.report()
+        n = mechcache.clear()
+        messagebox.showinfo(title = 'Mechanism Cache',
+                            message = report +
+                            '\n\nRemoved %d cached mechanisms.' % n)
+
+
     def importfile(self):
         #self.vimport.set(1)
-        w = self._windows['import']
+        w = self.window('import')
         w.show()
 
 
+    def window(self, name):
+        """Return the named top-level window, creating it on first use.
+
+        Returns None for a window showing the mixture if no mechanism has
+        been loaded yet.
+        """
+        if name in _mixwindows and self.mech is None:
+            return None
+        if name not in self._windows:
+            self.addWindow(name, self.makeWindow(name))
+        return self._windows[name]
+
+
+    def makeWindow(self, name):
+        if name == 'rxndata':
+            from .KineticsFrame import ReactionKineticsFrame
+            return ReactionKineticsFrame(self.vrxn, self)
+        elif name == 'rxnpaths':
+            from .KineticsFrame import ReactionPathFrame
+            return ReactionPathFrame(self)
+        elif name == 'dataset':
+            from .DataFrame import DataFrame
+            return DataFrame(None, self)
+        elif name == 'import':
+            from .ImportFrame import ImportFrame
+            return ImportFrame(self)
+
+
     def makeWindows(self):
 #        if self.mixfr:
         for w in self.windows:
+            self.scheduler.unsubscribe(w)
             try:
                 w.destroy()
             except:
                 pass
 
-        fr = [MixtureFrame, ThermoFrame, TransportFrame]
-
-        self.mixfr = MixtureFrame(self.cwin, self)
+        from .ThermoFrame import ThermoFrame
         self.thermo = ThermoFrame(self.cwin, self)
+        self.scheduler.subscribe(self.thermo, (COMPOSITION, STATE),
+                                 self.thermo.showState)
+        self.windows = [self.thermo]
 
-#        self.transport = TransportFrame(self.cwin, self)
-        self.kinetics = SpeciesKineticsFrame(self.cwin, self)
+        # the composition and kinetics panels are built when first shown
+        self.mixfr = None
+        self.kinetics = None
 
-        self.addWindow('rxndata',ReactionKineticsFrame(self.vrxn, self))
-        self.addWindow('rxnpaths',ReactionPathFrame(self))
-        self.addWindow('dataset',DataFrame(None, self))
+#        self.transport = TransportFrame(self.cwin, self)
 
+        # rebuild the top-level windows that have been opened for the
+        # previous mechanism; the others are created on first use
+        for name in list(self._windows.keys()):
+            if name != 'import':
+                self.addWindow(name, self.makeWindow(name))
 
         #self.edit = EditFrame(t, self)
 
-        self.windows = [self.mixfr,
-                        self.thermo, self.transport,
-                        self.kinetics]
-
         self.showthermo()
         self.showcomp()
         #self.showtransport()
@@ -295,21 +357,39 @@ class MixMaster:
             self.show(self.thermo, self.vtherm.get(), 7, 0)
 
     def showcomp(self):
+        if self.thermo and self.vcomp.get() and not self.mixfr:
+            from .CompositionFrame import MixtureFrame
+            self.mixfr = MixtureFrame(self.cwin, self)
+            self.scheduler.subscribe(self.mixfr, (COMPOSITION, STATE),
+                                     self.mixfr.show)
+            self.windows.append(self.mixfr)
         if self.mixfr:
             self.show(self.mixfr, self.vcomp.get(), 8, 0)
 
     def showkinetics(self):
+        if self.thermo and self.vkin.get() and not self.kinetics:
+            from .KineticsFrame import SpeciesKineticsFrame
+            self.kinetics = SpeciesKineticsFrame(self.cwin, self)
+            self.scheduler.subscribe(self.kinetics, (RATES,),
+                                     self.kinetics.show)
+            self.windows.append(self.kinetics)
         if self.kinetics:
             self.show(self.kinetics, self.vkin.get(), 10, 0)
 
     def showrxns(self):
-        self._windows['rxndata'].show()
+        w = self.window('rxndata')
+        if w:
+            w.show()
 
     def showrpaths(self):
-        self._windows['rxnpaths'].show()
+        w = self.window('rxnpaths')
+        if w:
+            w.show()
 
     def showdata(self):
-        self._windows['dataset'].browseForDatafile()
+        w = self.window('dataset')
+        if w:
+            w.browseForDatafile()
 
     def aboutmix(self):
 
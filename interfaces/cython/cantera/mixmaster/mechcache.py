@@ -0,0 +1,127 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# On-disk cache of converted mechanism files. Input files that Cantera has
+# to translate before use (.cti, .xml) are stored in serialized form,
+# keyed by path, modification time and content hash, so later sessions
+# can load them without re-parsing the original.
+
+import os
+import time
+import hashlib
+import tempfile
+
+import cantera
+from cantera import Solution
+from .thermocache import findFile
+from .fileutils import replaceFile
+
+# input formats that are already loaded natively and are never cached
+_NATIVE = ('.yaml', '.yml')
+
+stats = {'hits':0, 'misses':0, 'hittime':0.0, 'misstime':0.0}
+
+def cacheDir(name):
+    """Return (creating it if needed) a per-user MixMaster cache directory."""
+    base = os.environ.get('XDG_CACHE_HOME',
+                          os.path.join(os.path.expanduser('~'), '.cache'))
+    d = os.path.join(base, 'mixmaster', name)
+    if not os.path.isdir(d):
+        try:
+            os.makedirs(d)
+        except OSError:
+            if not os.path.isdir(d):
+                raise
+    return d
+
+def _serialize(g, src, dest):
+    """Write the serialized form of g to dest. Returns the path written."""
+    if hasattr(g, 'write_yaml'):
+        ext = '.yaml'
+    elif src.endswith('.cti'):
+        ext = '.xml'
+    else:
+        return None
+    # write to a temporary file first so that concurrent sessions never
+    # see a partially written entry
+    fd, tmp = tempfile.mkstemp(suffix=ext, dir=os.path.dirname(dest))
+    os.close(fd)
+    try:
+        if ext == '.yaml':
+            g.write_yaml(tmp)
+        else:
+            from cantera import ctml_writer
+            ctml_writer.convert(filename=src, outName=tmp)
+        replaceFile(tmp, dest + ext)
+        return dest + ext
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def load(pathname):
+    """Create a Solution for ``pathname``, using the disk cache if possible.
+
+    Returns the Solution and the SHA-1 hash of the input file contents,
+    which is the same key as thermocache.mechanismKey.
+    """
+    src = findFile(pathname)
+    if src is None:
+        return Solution(pathname), None
+
+    with open(src, 'rb') as f:
+        digest = hashlib.sha1(f.read()).hexdigest()
+    if os.path.splitext(src)[1] in _NATIVE:
+        return Solution(src), digest
+
+    src = os.path.abspath(src)
+    h = hashlib.sha1()
+    h.update(src.encode())
+    h.update(repr(os.path.getmtime(src)).encode())
+    h.update(digest.encode())
+    h.update(cantera.__version__.encode())
+    base = os.path.join(cacheDir('mechanisms'), h.hexdigest())
+
+    t0 = time.time()
+    for ext in ('.yaml', '.xml'):
+        if os.path.isfile(base + ext):
+            try:
+                g = Solution(base + ext)
+            except Exception:
+                # an unreadable entry is simply rebuilt below
+                break
+            stats['hits'] += 1
+            stats['hittime'] += time.time() - t0
+            return g, digest
+
+    g = Solution(src)
+    stats['misses'] += 1
+    stats['misstime'] += time.time() - t0
+    try:
+        _serialize(g, src, base)
+    except Exception as e:
+        print('Warning: could not cache mechanism '+src+': '+str(e))
+    return g, digest
+
+def clear():
+    """Delete all cached mechanisms. Returns the number of files removed."""
+    d = cacheDir('mechanisms')
+    n = 0
+    for f in os.listdir(d):
+        try:
+            os.remove(os.path.join(d, f))
+            n += 1
+        except OSError:
+            pass
+    return n
+
+def report():
+    """Summary of cache hits and misses in this session, with timings."""
+    s = 'Mechanism cache: %d hits (%.3f s), %d misses (%.3f s)' % (
+        stats['hits'], stats['hittime'], stats['misses'], stats['misstime'])
+    if stats['hits']:
+        s += '\nmean load time from cache: %.3f s' % (
+            stats['hittime']/stats['hits'])
+    if stats['misses']:
+        s += '\nmean load time from source: %.3f s' % (
+            stats['misstime']/stats['misses'])
+    return s
@@ -0,0 +1,103 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Ranking of reactions and species by importance at the current state.
+# Each ranking returns the indices of the top entries, most important
+# first, together with the signed values they were ranked by.
+
+import numpy as np
+
+from .lru import LRUCache
+
+# ways of ranking reactions
+RATE = 'rate'
+SPECIES = 'species'
+HEAT = 'heat'
+
+def top(score, n=None):
+    """Indices of the n largest entries of score, largest first.
+
+    Only the n largest entries are sorted, so this is much cheaper than a
+    full sort when n is small compared to the length of score.
+    """
+    score = np.asarray(score)
+    if n is None or n >= len(score):
+        return np.argsort(-score, kind='mergesort')
+    if n <= 0:
+        return np.zeros(0, int)
+    part = np.argpartition(-score, n - 1)[:n]
+    return part[np.argsort(-score[part], kind='mergesort')]
+
+# net stoichiometric coefficients, per mechanism, as compressed rows
+_net = LRUCache(maxitems=4)
+
+def _stoich(g, name):
+    # a method in older versions of Cantera, a property in newer ones,
+    # and possibly a sparse matrix
+    m = getattr(g, name)
+    if callable(m):
+        m = m()
+    return m
+
+def _netMatrix(g, mechkey=None):
+    key = (mechkey or id(g), g.n_species, g.n_reactions)
+    m = _net.get(key)
+    if m is None:
+        net = _stoich(g, 'product_stoich_coeffs') \
+            - _stoich(g, 'reactant_stoich_coeffs')
+        if hasattr(net, 'tocsr'):
+            net = net.tocsr()
+            m = (net.indptr, net.indices, net.data)
+        else:
+            net = np.asarray(net)
+            rows, cols = np.nonzero(net)
+            m = (np.searchsorted(rows, np.arange(g.n_species + 1)), cols,
+                 net[rows, cols])
+        _net.put(key, m)
+    return m
+
+def netStoich(g, k, mechkey=None):
+    """Net stoichiometric coefficients of species k in every reaction."""
+    indptr, cols, data = _netMatrix(g, mechkey)
+    if k < 0:
+        k += g.n_species
+    s = np.zeros(g.n_reactions)
+    s[cols[indptr[k]:indptr[k+1]]] = data[indptr[k]:indptr[k+1]]
+    return s
+
+def contributions(g, by=RATE, species=None, mechkey=None):
+    """Signed per-reaction values for a ranking.
+
+    RATE gives the net rates of progress, SPECIES the contribution of each
+    reaction to the net production rate of species (an index or name), and
+    HEAT the volumetric heat release rate of each reaction.
+    """
+    q = g.net_rates_of_progress
+    if by == RATE:
+        return q
+    elif by == SPECIES:
+        if isinstance(species, str):
+            species = g.species_index(species)
+        return netStoich(g, species, mechkey)*q
+    elif by == HEAT:
+        return -g.delta_enthalpy*q
+    raise ValueError('unknown ranking: ' + repr(by))
+
+def reactions(g, n=10, by=RATE, species=None, mechkey=None):
+    """The n most important reactions at the current state of g.
+
+    Reactions are ranked by the magnitude of the values returned by
+    contributions(). Returns the reaction indices and their values.
+    """
+    values = contributions(g, by, species, mechkey)
+    order = top(abs(values), n)
+    return order, values[order]
+
+def speciesRates(g, n=10):
+    """The n species with the largest net production rates (in magnitude).
+
+    Returns the species indices and their net production rates.
+    """
+    wdot = g.net_production_rates
+    order = top(abs(wdot), n)
+    return order, wdot[order]
@@ -0,0 +1,330 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Reaction path diagrams and element flux matrices, built off the Tk
+# thread.
+
+import os
+import sys
+import uuid
+import signal
+import hashlib
+import threading
+import subprocess
+
+if sys.version_info[0] == 3:
+    import queue
+else:
+    import Queue as queue
+
+import numpy as np
+from cantera import ReactionPathDiagram
+
+from . import mechcache
+from .lru import LRUCache
+from .fileutils import replaceFile
+
+# maximum total size of the diagram cache
+_MAXBYTES = 64*1024*1024
+
+# flux matrices, per mechanism, element and state
+_fluxes = LRUCache(maxbytes=16*1024*1024)
+
+# fields of a request that determine the diagram
+_KEYFIELDS = ('mechkey', 'element', 'threshold', 'flow', 'details',
+              'species', 'command', 'image')
+
+def _hashState(h, state):
+    T, P, X = state
+    h.update(np.array([T, P], float).tobytes())
+    h.update(np.asarray(X, float).tobytes())
+
+def diagramKey(request):
+    """Hash of everything that determines a rendered diagram."""
+    h = hashlib.sha1()
+    for f in _KEYFIELDS:
+        h.update(repr(request.get(f)).encode())
+    _hashState(h, request['state'])
+    return h.hexdigest()
+
+def prune(d, maxbytes=_MAXBYTES):
+    """Delete the least recently used files in d beyond maxbytes."""
+    files = []
+    for f in os.listdir(d):
+        try:
+            st = os.stat(os.path.join(d, f))
+        except OSError:
+            continue
+        files.append((st.st_mtime, st.st_size, f))
+    total = sum(f[1] for f in files)
+    for mtime, size, f in sorted(files):
+        if total <= maxbytes:
+            break
+        try:
+            os.remove(os.path.join(d, f))
+            total -= size
+        except OSError:
+            pass
+
+class FluxMatrix:
+    """Sparse species x species matrix of element fluxes.
+
+    Entries are held in coordinate form: element (row[n], col[n]) is the
+    flux data[n] (kmol/m^3/s) of the element from species row[n] to
+    species col[n]. SciPy is not needed; tocoo() returns the equivalent
+    scipy.sparse matrix when it is installed.
+    """
+    def __init__(self, row, col, data, shape):
+        self.row = np.asarray(row, int)
+        self.col = np.asarray(col, int)
+        self.data = np.asarray(data, float)
+        self.shape = shape
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    @property
+    def nbytes(self):
+        return self.row.nbytes + self.col.nbytes + self.data.nbytes
+
+    def _subset(self, mask):
+        return FluxMatrix(self.row[mask], self.col[mask], self.data[mask],
+                          self.shape)
+
+    def toarray(self):
+        a = np.zeros(self.shape)
+        np.add.at(a, (self.row, self.col), self.data)
+        return a
+
+    def tocoo(self):
+        from scipy import sparse
+        return sparse.coo_matrix((self.data, (self.row, self.col)),
+                                 shape=self.shape)
+
+    def net(self):
+        """Net fluxes: one positive entry per pair of species."""
+        n = self.shape[1]
+        row = np.concatenate((self.row, self.col))
+        col = np.concatenate((self.col, self.row))
+        data = np.concatenate((self.data, -self.data))
+        pair, inv = np.unique(row*n + col, return_inverse=True)
+        total = np.zeros(len(pair))
+        np.add.at(total, inv, data)
+        keep = total > 0
+        return FluxMatrix(pair[keep] // n, pair[keep] % n, total[keep],
+                          self.shape)
+
+    def threshold(self, t):
+        """Entries of at least t times the largest flux."""
+        if not self.nnz:
+            return self
+        return self._subset(self.data >= t*self.data.max())
+
+    def select(self, k):
+        """Entries of fluxes into or out of species k."""
+        return self._subset((self.row == k) | (self.col == k))
+
+    def edges(self):
+        """(from, to, flux) triples, largest flux first."""
+        order = np.argsort(-self.data, kind='mergesort')
+        return list(zip(self.row[order], self.col[order], self.data[order]))
+
+def fluxMatrix(g, element):
+    """The flux matrix of element at the current state of g.
+
+    This runs Cantera's reaction path analysis in-process, without writing
+    a DOT file or running Graphviz.
+    """
+    d = ReactionPathDiagram(g, element)
+    d.threshold = 0.0
+    index = dict((nm, k) for k, nm in enumerate(g.species_names))
+    row, col, data = [], [], []
+    # a blank line, the species in the diagram, then one line per pair
+    for line in d.get_data().splitlines()[2:]:
+        f = line.split()
+        if len(f) != 4:
+            continue
+        i, j = index[f[0]], index[f[1]]
+        fwd, rev = float(f[2]), -float(f[3])
+        if fwd > 0.0:
+            row.append(i)
+            col.append(j)
+            data.append(fwd)
+        if rev > 0.0:
+            row.append(j)
+            col.append(i)
+            data.append(rev)
+    return FluxMatrix(row, col, data, (g.n_species, g.n_species))
+
+def fluxes(g, element, mechkey=None):
+    """fluxMatrix(g, element), cached per mechanism, element and state."""
+    h = hashlib.sha1()
+    h.update(repr((mechkey or id(g), element)).encode())
+    _hashState(h, g.TPX)
+    key = h.hexdigest()
+    m = _fluxes.get(key)
+    if m is None:
+        m = fluxMatrix(g, element)
+        _fluxes.put(key, m)
+    return m
+
+class PathWorker:
+    """Builds reaction path diagrams on a worker thread with its own
+    Solution, caching them in workdir under diagramKey(). Each submit()
+    supersedes earlier requests; results are put on ``results`` as
+    (generation, result, error) tuples."""
+    def __init__(self, pathname, workdir=None, maxbytes=_MAXBYTES):
+        self.pathname = pathname
+        self.workdir = workdir or mechcache.cacheDir('rxnpath')
+        self.maxbytes = maxbytes
+        self.generation = 0
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.proc = None
+        self.gas = None
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def submit(self, request):
+        with self.lock:
+            self.generation += 1
+            gen = self.generation
+            self._kill()
+        self.requests.put((gen, request))
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run)
+            self.thread.daemon = True
+            self.thread.start()
+        return gen
+
+    def stop(self):
+        """Cancel any work in progress and end the worker thread."""
+        with self.lock:
+            self.generation += 1
+            self._kill()
+        if self.thread is not None:
+            self.requests.put(None)
+
+    def current(self, gen):
+        return gen == self.generation
+
+    def _kill(self):
+        # called with the lock held
+        if self.proc is None or self.proc.poll() is not None:
+            return
+        try:
+            if os.name == 'posix':
+                os.killpg(self.proc.pid, signal.SIGTERM)
+            else:
+                self.proc.kill()
+        except OSError:
+            pass
+
+    def _run(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            gen, request = item
+            if not self.current(gen):
+                continue
+            result = err = None
+            try:
+                result = self.build(gen, request)
+            except Exception as e:
+                err = e
+            if self.current(gen):
+                self.results.put((gen, result, err))
+
+    def solution(self):
+        if self.gas is None:
+            self.gas = mechcache.load(self.pathname)[0]
+        return self.gas
+
+    def build(self, gen, request):
+        """Return the diagram for request, from the cache if possible.
+
+        Returns a dict with the paths of the DOT file and image and the
+        image format if it is to be shown in a web browser, or None if the
+        request was superseded while Graphviz was running.
+        """
+        if request.get('matrix'):
+            return {'matrix': self.matrix(request), 'format': None}
+
+        key = diagramKey(request)
+        base = os.path.join(self.workdir, key)
+        result = {'dot': base + '.dot', 'image': None,
+                  'format': request.get('format')}
+        command = request.get('command')
+        if command:
+            ext = os.path.splitext(request['image'])[1]
+            result['image'] = base + ext
+        paths = [p for p in (result['dot'], result['image']) if p]
+        if all(os.path.isfile(p) for p in paths):
+            for p in paths:
+                os.utime(p, None)
+            return result
+
+        # write under a private name, then rename into place
+        tmp = key + '-' + uuid.uuid4().hex[:8]
+        tmpfiles = [os.path.join(self.workdir, tmp + '.dot')]
+        try:
+            self.write(request, tmpfiles[0])
+            if command:
+                tmpfiles.append(os.path.join(self.workdir, tmp + ext))
+                if not self.render(gen, command.replace('rxnpath.',
+                                                        tmp + '.')):
+                    return None
+            for src, dest in zip(tmpfiles, paths):
+                replaceFile(src, dest)
+        finally:
+            for f in tmpfiles:
+                if os.path.exists(f):
+                    os.remove(f)
+        prune(self.workdir, self.maxbytes)
+        return result
+
+    def matrix(self, request):
+        g = self.solution()
+        g.TPX = request['state']
+        m = fluxes(g, request['element'], request.get('mechkey'))
+        if request['flow'] == 'NetFlow':
+            m = m.net()
+        m = m.threshold(request['threshold'])
+        try:
+            m = m.select(g.species_index(request['species']))
+        except Exception:
+            pass
+        return m
+
+    def write(self, request, dotfile):
+        g = self.solution()
+        g.TPX = request['state']
+        d = ReactionPathDiagram(g, request['element'])
+        d.arrow_width = -2
+        d.flow_type = request['flow']
+        d.show_details = request['details']
+        d.threshold = request['threshold']
+        try:
+            d.display_only(g.species_index(request['species']))
+        except Exception:
+            d.display_only(-1)
+        d.write_dot(dotfile)
+
+    def render(self, gen, command):
+        with self.lock:
+            if not self.current(gen):
+                return False
+            kw = {}
+            if os.name == 'posix':
+                # a process group, so that killing it also stops dot when
+                # the shell does not exec it
+                kw['preexec_fn'] = os.setsid
+            self.proc = subprocess.Popen(command, shell=True,
+                                         cwd=self.workdir, **kw)
+            proc = self.proc
+        proc.wait()
+        if proc.returncode != 0 and self.current(gen):
+            raise RuntimeError('command failed: ' + command)
+        return self.current(gen)
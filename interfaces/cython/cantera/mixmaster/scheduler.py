@@ -0,0 +1,95 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+from __future__ import print_function
+
+import traceback
+
+# facets of the mixture state that windows can subscribe to
+COMPOSITION = 'composition'
+STATE = 'state'
+RATES = 'rates'
+ALL = (COMPOSITION, STATE, RATES)
+
+# quiet period in ms before a debounced callback runs
+_DELAY = 250
+
+class UpdateScheduler:
+    """Coalesces change notifications into one refresh per idle cycle.
+
+    Windows subscribe a callback to the facets of the mixture they
+    display. notify() only marks facets as changed; the first notification
+    in a cycle schedules flush() with after_idle, which then calls every
+    subscriber whose facets changed exactly once. Rates depend on both the
+    composition and the thermodynamic state, so a change to either also
+    marks the rates as changed.
+    """
+    def __init__(self, widget):
+        self.widget = widget
+        self.subscribers = []
+        self.dirty = set()
+        self.pending = None
+
+    def subscribe(self, owner, facets, callback, active=None):
+        """Call callback when any of facets changes.
+
+        If active is given it is called first, and the callback is skipped
+        if it returns false (for example, while a window is withdrawn).
+        """
+        self.subscribers.append((owner, set(facets), callback, active))
+
+    def unsubscribe(self, owner):
+        self.subscribers = [s for s in self.subscribers if s[0] is not owner]
+
+    def notify(self, *facets):
+        if not facets:
+            facets = ALL
+        self.dirty.update(facets)
+        if COMPOSITION in self.dirty or STATE in self.dirty:
+            self.dirty.add(RATES)
+        if self.pending is None:
+            self.pending = self.widget.after_idle(self.flush)
+
+    def flush(self):
+        self.pending = None
+        dirty, self.dirty = self.dirty, set()
+        for owner, facets, callback, active in list(self.subscribers):
+            if not facets & dirty:
+                continue
+            try:
+                if active is None or active():
+                    callback()
+            except Exception:
+                traceback.print_exc()
+
+
+class Debouncer:
+    """Runs a callback once, after calls to trigger() stop for delay ms.
+
+    Every trigger() restarts the timer, so a burst of events (such as the
+    pointer crossing many entries) results in a single call.
+    """
+    def __init__(self, widget, callback, delay=_DELAY):
+        self.widget = widget
+        self.callback = callback
+        self.delay = delay
+        self.pending = None
+
+    def trigger(self, event=None):
+        self.cancel()
+        self.pending = self.widget.after(self.delay, self._run)
+
+    def cancel(self):
+        if self.pending is not None:
+            self.widget.after_cancel(self.pending)
+            self.pending = None
+
+    def flush(self):
+        """Run a pending callback now."""
+        if self.pending is not None:
+            self.cancel()
+            self.callback()
+
+    def _run(self):
+        self.pending = None
+        self.callback()
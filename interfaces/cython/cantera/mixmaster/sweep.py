@@ -0,0 +1,83 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+import multiprocessing
+import numpy as np
+
+from .Mix import Mix
+from . import mechcache
+
+# per-process state for pool workers
+_worker = {}
+
+def resultType(nsp):
+    """Structured dtype of the rows returned by sweep()."""
+    return np.dtype([('ok', bool),
+                     ('T', 'd'), ('P', 'd'), ('density', 'd'),
+                     ('u', 'd'), ('h', 'd'), ('s', 'd'), ('cp', 'd'),
+                     ('mw', 'd'), ('X', 'd', (nsp,))])
+
+def _init(mech):
+    _worker['mix'] = Mix(mechcache.load(mech)[0], mech)
+
+def _run(args):
+    pair, v1, v2, comp, equil = args
+    mix = _worker['mix']
+    g = mix.g
+    g.X = comp
+    x0 = g.X
+    out = np.zeros(len(v1), resultType(g.n_species))
+    for n in range(len(v1)):
+        mix.setMoles(x0.copy())
+        try:
+            if mix.set(equil=equil, **{pair[0]:v1[n], pair[1]:v2[n]}) is None:
+                raise ValueError('unsupported property pair')
+        except Exception:
+            out['ok'][n] = False
+            for f in out.dtype.names[1:]:
+                out[f][n] = np.nan
+            continue
+        out['ok'][n] = True
+        out['T'][n] = g.T
+        out['P'][n] = g.P
+        out['density'][n] = g.density
+        out['u'][n] = g.int_energy_mass
+        out['h'][n] = g.enthalpy_mass
+        out['s'][n] = g.entropy_mass
+        out['cp'][n] = g.cp_mass
+        out['mw'][n] = g.mean_molecular_weight
+        out['X'][n] = g.X
+    return out
+
+def sweep(mech, pair, v1, v2, comp, equil=0, processes=1):
+    """Evaluate a batch of states of one mixture.
+
+    Each point starts from composition ``comp`` (a mole-fraction array or a
+    composition string) and is set with Mix.set using the two keyword
+    arguments named in ``pair``, e.g. ('temperature', 'pressure') or
+    ('enthalpy', 'pressure'), taking their values from the arrays ``v1``
+    and ``v2``. If ``equil`` is set each point is equilibrated at the
+    specified property pair.
+
+    The points are evaluated on a pool of ``processes`` worker processes,
+    each holding its own Solution created from the input file ``mech``.
+    Returns a structured array with one row per point (see resultType);
+    points that fail have ``ok`` set to False and NaN properties.
+    """
+    v1 = np.atleast_1d(np.asarray(v1, dtype=float))
+    v2 = np.atleast_1d(np.asarray(v2, dtype=float))
+    v1, v2 = np.broadcast_arrays(v1, v2)
+    if processes <= 1 or len(v1) == 0:
+        _init(mech)
+        return _run((pair, v1, v2, comp, equil))
+
+    nchunk = min(len(v1), 4*processes)
+    jobs = [(pair, a, b, comp, equil) for a, b in
+            zip(np.array_split(v1, nchunk), np.array_split(v2, nchunk))]
+    pool = multiprocessing.Pool(processes, _init, (mech,))
+    try:
+        results = pool.map(_run, jobs)
+    finally:
+        pool.close()
+        pool.join()
+    return np.concatenate(results)
@@ -0,0 +1,341 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+
+import cantera as ct
+from cantera.mixmaster import (sweep, rxnpath, mechcache, ranking, batch,
+                               dataset)
+from cantera.mixmaster.Mix import Mix, SpeciesList, speciesThermo, statePairs
+from cantera.mixmaster.thermocache import ThermoCache
+
+
+def dataFile(name):
+    return os.path.join(ct.__path__[0], 'data', name)
+
+
+class TempDirTest(unittest.TestCase):
+    # runs each test with the per-user caches in a temporary directory
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachehome = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.tmpdir, 'cache')
+
+    def tearDown(self):
+        if self.cachehome is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.cachehome
+        shutil.rmtree(self.tmpdir)
+
+
+class TestSweep(unittest.TestCase):
+    def test_zero_property(self):
+        # an axis that crosses zero must set the state at zero, not skip it
+        h = np.array([-1.0e5, 0.0, 1.0e5])
+        out = sweep.sweep('h2o2.yaml', ('enthalpy', 'pressure'), h,
+                          101325.0, 'H2:2, O2:1, AR:10')
+        self.assertTrue(out['ok'].all())
+        np.testing.assert_allclose(out['h'], h, atol=1.0e-3)
+        self.assertTrue((np.diff(out['T']) > 0).all())
+
+    def test_empty(self):
+        out = sweep.sweep('h2o2.yaml', ('temperature', 'pressure'), [],
+                          101325.0, 'H2:2, O2:1', processes=2)
+        self.assertEqual(len(out), 0)
+        self.assertEqual(out.dtype, sweep.resultType(10))
+
+    def test_unsupported_pair(self):
+        out = sweep.sweep('h2o2.yaml', ('temperature', 'enthalpy'),
+                          [300.0, 400.0], 0.0, 'H2:2, O2:1')
+        self.assertFalse(out['ok'].any())
+        self.assertTrue(np.isnan(out['T']).all())
+
+
+class TestFluxMatrix(unittest.TestCase):
+    def test_four_species(self):
+        # the species line of a 4-species diagram has four fields too
+        g = ct.Solution('h2o2.yaml')
+        g.TPX = 1500.0, ct.one_atm, 'H2:1, H2O:1'
+        m = rxnpath.fluxMatrix(g, 'H')
+        self.assertEqual(m.shape, (g.n_species, g.n_species))
+        self.assertTrue(m.nnz > 0)
+        self.assertTrue((m.data > 0).all())
+        used = set(m.row) | set(m.col)
+        names = set(g.species_name(k) for k in used)
+        self.assertTrue(names <= set(['H', 'H2', 'H2O', 'OH']))
+
+
+class TestSpeciesThermo(unittest.TestCase):
+    def check(self, mech):
+        g = ct.Solution(mech)
+        t = np.array([300.0, 800.0, 1000.0, 1500.0, 2500.0])
+        cp, h, s = speciesThermo(g, t)
+        self.assertEqual(cp.shape, (g.n_species, len(t)))
+        for n, T in enumerate(t):
+            g.TP = T, g.reference_pressure
+            np.testing.assert_allclose(cp[:,n], g.standard_cp_R, rtol=1e-10)
+            np.testing.assert_allclose(h[:,n], g.standard_enthalpies_RT,
+                                       rtol=1e-10, atol=1e-10)
+            np.testing.assert_allclose(s[:,n], g.standard_entropies_R,
+                                       rtol=1e-10)
+
+    def test_nasa7(self):
+        self.check('gri30.yaml')
+
+    def test_nasa9(self):
+        self.check('airNASA9.yaml')
+
+    def test_single_species(self):
+        g = ct.Solution('h2o2.yaml')
+        g.TP = 1200.0, g.reference_pressure
+        state = g.TPX
+        cp, h, s = speciesThermo(g, 1200.0, 'OH')
+        self.assertEqual(np.shape(cp), ())
+        k = g.species_index('OH')
+        self.assertAlmostEqual(float(h), g.standard_enthalpies_RT[k])
+        # the state of the phase is not changed
+        self.assertEqual(g.TPX[0], state[0])
+
+    def test_cache(self):
+        g = ct.Solution('h2o2.yaml')
+        cache = ThermoCache()
+        t = np.linspace(300.0, 3000.0, 10)
+        a = cache.curves('h2o2', g, 2, t)
+        b = cache.curves('h2o2', g, 2, t)
+        self.assertIs(a, b)
+        np.testing.assert_array_equal(a[0], speciesThermo(g, t, 2)[0])
+        hf0 = cache.hf0('h2o2', g)
+        g.TP = 298.15, g.reference_pressure
+        hf = g.standard_enthalpies_RT*ct.gas_constant*298.15
+        np.testing.assert_allclose(hf0, hf, rtol=1e-10, atol=1e-3)
+
+
+class TestMechCache(TempDirTest):
+    def test_round_trip(self):
+        # a file Cantera reads but that is not in a native format
+        src = os.path.join(self.tmpdir, 'h2o2.inp')
+        shutil.copy(dataFile('h2o2.yaml'), src)
+        d = mechcache.cacheDir('mechanisms')
+
+        hits = mechcache.stats['hits']
+        g1, key1 = mechcache.load(src)
+        files = os.listdir(d)
+        self.assertEqual(len(files), 1)
+        self.assertEqual(mechcache.stats['hits'], hits)
+
+        g2, key2 = mechcache.load(src)
+        self.assertEqual(mechcache.stats['hits'], hits + 1)
+        self.assertEqual(os.listdir(d), files)
+        self.assertEqual(key1, key2)
+        self.assertEqual(g1.species_names, g2.species_names)
+        self.assertEqual(g1.n_reactions, g2.n_reactions)
+
+
+class TestDataset(TempDirTest):
+    def setUp(self):
+        TempDirTest.setUp(self)
+        self.g = ct.Solution('h2o2.yaml')
+        self.z = np.linspace(0.0, 0.02, 101)
+        self.T = 300.0 + 1.0e5*self.z
+        self.Y = np.outer(1.0 - 40.0*self.z, [0.1, 0.2])
+
+    def test_csv_binary_round_trip(self):
+        g = self.g
+        csv = os.path.join(self.tmpdir, 'flame.csv')
+        with open(csv, 'w') as f:
+            # the last named column is not read
+            f.write('z (m), T, XX, H2, O2, end\n')
+            for n in range(len(self.z)):
+                f.write('%.17g, %.17g, 1.0, %.17g, %.17g, 0\n' % (
+                    self.z[n], self.T[n], self.Y[n,0], self.Y[n,1]))
+
+        cols = dataset.csvColumns(csv, g)
+        self.assertEqual([c[2] for c in cols], ['z', 'T', 'H2', 'O2'])
+        data, label = dataset.readCSV(csv, cols, g.n_species, chunk=7)
+        kH2 = g.species_index('H2') + dataset.Y_LOC
+        kO2 = g.species_index('O2') + dataset.Y_LOC
+        np.testing.assert_array_equal(data[0,:], self.z)
+        np.testing.assert_array_equal(data[dataset.T_LOC,:], self.T)
+        np.testing.assert_array_equal(data[kO2,:], self.Y[:,1])
+        self.assertEqual(set(data.columns), set([0, dataset.T_LOC, kH2, kO2]))
+
+        mxd = os.path.join(self.tmpdir, 'flame' + dataset.BINARY)
+        dataset.writeBinary(mxd, data, label, g.species_names)
+        b, blabel, bcols = dataset.openBinary(mxd, g)
+        self.assertEqual(b.shape, data.shape)
+        self.assertEqual(blabel, label)
+        self.assertEqual([c[1] for c in bcols], [0, dataset.T_LOC, kH2, kO2])
+        for i in range(data.shape[0]):
+            np.testing.assert_array_equal(b[i,:], data[i,:])
+        np.testing.assert_array_equal(b.massFractions(10),
+                                      data.massFractions(10))
+        # memory-mapped columns are not counted as resident
+        self.assertEqual(b.nbytes, 0)
+
+    def test_cancel(self):
+        csv = os.path.join(self.tmpdir, 'flame.csv')
+        with open(csv, 'w') as f:
+            f.write('z, T, end\n')
+            for n in range(100):
+                f.write('%d, 300, 0\n' % n)
+        cols = dataset.csvColumns(csv, self.g)
+        self.assertRaises(dataset.Cancelled, dataset.readCSV, csv, cols,
+                          self.g.n_species, cancel=lambda: True)
+
+
+class TestXMLIndex(TempDirTest):
+    def write(self, fname, nsim, npts):
+        with open(fname, 'w') as f:
+            f.write('<?xml version="1.0"?>\n<ctml>\n')
+            for i in range(nsim):
+                f.write('<simulation id="run%d">\n' % i)
+                f.write('<flowfield type="Free Flame">\n')
+                f.write('<float title="pressure">%g</float>\n' % (1.0e5*(i+1)))
+                f.write('<grid_data>\n')
+                for title in ('z', 'T', 'H2', 'unknown'):
+                    v = np.arange(npts) + 10*i
+                    f.write('<floatArray title="%s" size="%d">\n'
+                            % (title, npts))
+                    f.write(',\n'.join('%.6e' % x for x in v))
+                    f.write('\n</floatArray>\n')
+                f.write('</grid_data>\n</flowfield>\n</simulation>\n')
+            f.write('</ctml>\n')
+
+    def test_index(self):
+        g = ct.Solution('h2o2.yaml')
+        fname = os.path.join(self.tmpdir, 'flames.xml')
+        self.write(fname, 3, 20)
+        index = dataset.xmlIndex(fname)
+        self.assertEqual(index.ids, ['run0', 'run1', 'run2'])
+        # nothing is parsed until a simulation is read
+        self.assertEqual(index.entries, {})
+        self.assertIs(dataset.xmlIndex(fname), index)
+
+        data, label, cols = index.read('run1', g)
+        self.assertEqual(list(index.entries), ['run1'])
+        kH2 = g.species_index('H2') + dataset.Y_LOC
+        self.assertEqual(cols, [('T', dataset.T_LOC), ('H2', kH2)])
+        self.assertEqual(data.shape, (g.n_species + 6, 20))
+        # arrays are decoded when first used
+        self.assertIn(kH2, data.loaders)
+        np.testing.assert_array_equal(data[kH2,:], np.arange(20) + 10)
+        self.assertNotIn(kH2, data.loaders)
+        self.assertEqual(data[dataset.P_LOC,0], 2.0e5)
+
+        data, label, sid = dataset.readXML(fname, g)
+        self.assertEqual(sid, 'run2')
+        np.testing.assert_array_equal(data[0,:], np.arange(20) + 20)
+
+
+class TestSpeciesList(unittest.TestCase):
+    def test_numpy_index(self):
+        g = ct.Solution('h2o2.yaml')
+        species = SpeciesList(g)
+        for k in np.arange(g.n_species):
+            self.assertEqual(species[k].name, g.species_name(int(k)))
+
+
+class TestRanking(unittest.TestCase):
+    def setUp(self):
+        self.g = ct.Solution('gri30.yaml')
+        self.g.TPX = 1800.0, ct.one_atm, 'CH4:1, O2:2, N2:7.52, OH:0.01'
+
+    def test_net_stoich(self):
+        g = self.g
+        net = g.product_stoich_coeffs - g.reactant_stoich_coeffs
+        for k in (0, 5, -1):
+            np.testing.assert_array_equal(ranking.netStoich(g, k, 'gri'),
+                                          net[k])
+
+    def test_species_contributions(self):
+        g = self.g
+        k = g.species_index('OH')
+        c = ranking.contributions(g, ranking.SPECIES, 'OH', 'gri')
+        self.assertAlmostEqual(c.sum(), g.net_production_rates[k],
+                               delta=1.0e-9*abs(c).sum())
+
+    def test_reactions(self):
+        order, values = ranking.reactions(self.g, 10)
+        q = self.g.net_rates_of_progress
+        np.testing.assert_array_equal(values, q[order])
+        np.testing.assert_array_equal(
+            abs(values), np.sort(abs(q))[::-1][:10])
+
+
+class TestMix(unittest.TestCase):
+    def setUp(self):
+        self.mix = Mix(ct.Solution('h2o2.yaml'))
+
+    def test_set_moles_copies(self):
+        x = np.zeros(self.mix.nsp)
+        x[self.mix.speciesIndex('H2')] = 2.0
+        x[self.mix.speciesIndex('O2')] = 1.0
+        x0 = x.copy()
+        self.mix.setMoles(x)
+        self.mix.set(temperature=1500.0, pressure=ct.one_atm, equil=1)
+        np.testing.assert_array_equal(x, x0)
+        self.assertAlmostEqual(self.mix.totalMass(), np.dot(x0, self.mix.wt))
+
+    def test_dicts(self):
+        x = np.arange(self.mix.nsp, dtype=float)
+        self.mix.setMoles(x)
+        moles = self.mix.moleDict()
+        mass = self.mix.massDict()
+        self.assertEqual(sorted(moles.keys()),
+                         sorted(self.mix.speciesNames()))
+        for k, nm in enumerate(self.mix.speciesNames()):
+            self.assertEqual(moles[nm], x[k])
+            self.assertAlmostEqual(mass[nm], x[k]*self.mix.wt[k])
+
+
+class TestBatch(unittest.TestCase):
+    X = 'H2:2, O2:1, AR:5'
+
+    def setUp(self):
+        self.mix = Mix(ct.Solution('h2o2.yaml'))
+        self.ref = ct.Solution('h2o2.yaml')
+        self.ref.TPX = 1200.0, 2.0e5, self.X
+
+    def test_density_entropy(self):
+        ref = self.ref
+        row = batch.evaluate(self.mix, {'X': self.X,
+                                        'density': ref.density,
+                                        'entropy': ref.entropy_mass})
+        self.assertAlmostEqual(row[0], ref.T, delta=1.0e-6*ref.T)
+        self.assertAlmostEqual(row[1], ref.P, delta=1.0e-6*ref.P)
+
+    def test_pairs(self):
+        ref = self.ref
+        values = {'temperature': ref.T, 'pressure': ref.P,
+                  'density': ref.density, 'enthalpy': ref.enthalpy_mass,
+                  'entropy': ref.entropy_mass,
+                  'intEnergy': ref.int_energy_mass}
+        for pair in statePairs:
+            state = {'X': self.X}
+            for p in pair:
+                state[p] = values[p]
+            row = batch.evaluate(self.mix, state)
+            self.assertAlmostEqual(row[0], ref.T, delta=1.0e-6*ref.T,
+                                   msg=str(pair))
+            self.assertAlmostEqual(row[1], ref.P, delta=1.0e-6*ref.P,
+                                   msg=str(pair))
+
+    def test_rows(self):
+        states = [{'X': self.X, 'temperature': 300.0, 'pressure': 1.0e5},
+                  {'Y': 'H2:1, O2:8', 'enthalpy': 0.0, 'pressure': 1.0e5,
+                   'equilibrate': 1},
+                  {'X': self.X, 'temperature': 300.0}]
+        batch._init('h2o2.yaml')
+        rows = [batch._run((n, s)) for n, s in enumerate(states)]
+        self.assertEqual([r[1] for r in rows], [1, 1, 0])
+        self.assertTrue(rows[1][2] > 2000.0)
+        self.assertTrue(np.isnan(rows[2][2:]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
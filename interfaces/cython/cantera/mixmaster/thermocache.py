@@ -0,0 +1,83 @@
+# This file is part of Cantera. See License.txt in the top-level directory or
+# at http://www.cantera.org/license.txt for license and copyright information.
+
+# Process-wide cache of species thermo curves and heats of formation,
+# keyed by a hash of the mechanism input file.
+
+import os
+import hashlib
+import numpy as np
+
+import cantera
+from cantera import gas_constant
+from .Mix import speciesThermo
+from .lru import LRUCache
+
+# memory cap for all cached tables, in bytes
+_MAXBYTES = 64*1024*1024
+
+def findFile(pathname):
+    """Locate a mechanism file, searching the Cantera data directories."""
+    if os.path.isfile(pathname):
+        return pathname
+    dirs = []
+    if hasattr(cantera, 'get_data_directories'):
+        dirs = cantera.get_data_directories()
+    for d in dirs:
+        p = os.path.join(d, pathname)
+        if os.path.isfile(p):
+            return p
+    return None
+
+def mechanismKey(pathname, g=None):
+    """Return a hash identifying the mechanism loaded from ``pathname``.
+
+    The key is the SHA-1 digest of the input file contents. If the file
+    cannot be located and a phase ``g`` is given, the species names and
+    thermo coefficients of ``g`` are hashed instead.
+    """
+    h = hashlib.sha1()
+    fname = findFile(pathname) if pathname else None
+    if fname:
+        with open(fname, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+    elif g is not None:
+        for k in range(g.n_species):
+            h.update(g.species_name(k).encode())
+            h.update(np.asarray(g.species(k).thermo.coeffs).tobytes())
+    else:
+        h.update(str(pathname).encode())
+    return h.hexdigest()
+
+def _gridKey(t):
+    return hashlib.sha1(np.ascontiguousarray(t, dtype=float).tobytes()).hexdigest()
+
+class ThermoCache:
+    def __init__(self, maxbytes=_MAXBYTES):
+        self._cache = LRUCache(maxbytes=maxbytes)
+
+    def curves(self, key, g, k, t):
+        """Return (cp/R, h/RT, s/R) for species k of g over the grid t."""
+        t = np.asarray(t, dtype=float)
+        ck = ('curves', key, k, _gridKey(t))
+        value = self._cache.get(ck)
+        if value is None:
+            value = speciesThermo(g, t, k)
+            self._cache.put(ck, value)
+        return value
+
+    def hf0(self, key, g):
+        """Return the 298.15 K heats of formation (J/kmol) of all species."""
+        ck = ('hf0', key)
+        value = self._cache.get(ck)
+        if value is None:
+            t = 298.15
+            value = speciesThermo(g, [t])[1][:,0]*gas_constant*t
+            self._cache.put(ck, value)
+        return value
+
+    def clear(self):
+        self._cache.clear()
+
+thermoCache = ThermoCache()